@@ -8,5 +8,57 @@
 #from seqgentools.sequence import CombinationRange              # noqa: F401
 #from seqgentools.sequence import Combinations_with_replacement # noqa: F401
 
+import sys
+
+from seqgentools import sequence as _sequence
 from seqgentools.sequence import *
-from seqgentools.algorithms import *
+from seqgentools.algorithms import _lazy as _algorithms
+
+# generators and helpers outside of the core sequences load on first access
+# so that short-lived processes only pay for what they use
+_lazy = dict(_algorithms)
+_lazy.update({
+    "PersistentCache": "seqgentools.store",
+    "spec_hash": "seqgentools.store",
+    "optimize": "seqgentools.rewrite",
+    "Sweep": "seqgentools.sweep",
+    "RankPlan": "seqgentools.ranking",
+    "RankError": "seqgentools.ranking",
+})
+
+if sys.version_info >= (3, 5):
+    _lazy.update({
+        "aiter": "seqgentools.aio",
+        "amap": "seqgentools.aio",
+    })
+
+# "import *" does not consult __getattr__, so the lazy names are listed
+# after the core names
+__all__ = list(_sequence.__all__) + sorted(_lazy)
+
+if sys.version_info >= (3, 7):
+
+    def __getattr__(name):
+
+        if name not in _lazy:
+            raise AttributeError("module '%s' has no attribute '%s'"%(
+                __name__, name))
+
+        import importlib
+        value = getattr(importlib.import_module(_lazy[name]), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+
+        return sorted(set(globals()) | set(_lazy))
+
+else:
+    from seqgentools.algorithms import *
+    from seqgentools.store import PersistentCache, spec_hash
+    from seqgentools.rewrite import optimize
+    from seqgentools.sweep import Sweep
+    from seqgentools.ranking import RankPlan, RankError
+
+    if sys.version_info >= (3, 5):
+        from seqgentools.aio import aiter, amap
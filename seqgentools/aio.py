@@ -0,0 +1,138 @@
+# coding: utf-8
+
+import asyncio
+
+from seqgentools.sequence import INF
+
+class AsyncIterator(object):
+
+    def __init__(self, sequence, start=0):
+
+        self._sequence = sequence
+        self.index = start
+
+    def __aiter__(self):
+
+        return self
+
+    async def __anext__(self):
+
+        _len = self._sequence.length()
+        if _len != INF and self.index >= _len:
+            raise StopAsyncIteration
+
+        val = self._sequence[self.index]
+        self.index += 1
+        return val
+
+class AsyncMap(object):
+
+    def __init__(self, coro_fn, sequence, concurrency=1, ordered=False,
+            start=0, stop=None):
+
+        if concurrency < 1:
+            raise ValueError("concurrency must be a positive integer.")
+
+        self._coro_fn = coro_fn
+        self._sequence = sequence
+        self._concurrency = concurrency
+        self._ordered = ordered
+
+        _len = sequence.length()
+        self._stop = _len if stop is None else min(stop, _len)
+
+        self._next = start
+        self._tasks = {}
+        self._finished = {}
+        self._delivered = set()
+
+        # every index below resume_index has been handed to the consumer
+        self.resume_index = start
+
+    def __aiter__(self):
+
+        return self
+
+    async def __aenter__(self):
+
+        return self
+
+    async def __aexit__(self, *exc):
+
+        await self.aclose()
+
+    def _fill(self):
+
+        # results waiting for the consumer count against the limit so that
+        # a slow consumer throttles evaluation
+        while (len(self._tasks) + len(self._finished) < self._concurrency
+                and self._next < self._stop):
+            val = self._sequence[self._next]
+            task = asyncio.ensure_future(self._coro_fn(val))
+            self._tasks[task] = self._next
+            self._next += 1
+
+    def _ready(self):
+
+        if self._ordered:
+            if self.resume_index in self._finished:
+                return self.resume_index
+        elif self._finished:
+            return min(self._finished)
+
+    def _deliver(self, index):
+
+        result = self._finished[index].result()
+        del self._finished[index]
+        self._delivered.add(index)
+        while self.resume_index in self._delivered:
+            self._delivered.remove(self.resume_index)
+            self.resume_index += 1
+        return index, result
+
+    async def __anext__(self):
+
+        try:
+            while True:
+                index = self._ready()
+                if index is not None:
+                    return self._deliver(index)
+
+                self._fill()
+                if not self._tasks:
+                    raise StopAsyncIteration
+
+                done, _ = await asyncio.wait(list(self._tasks),
+                        return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    self._finished[self._tasks.pop(task)] = task
+
+        except (Exception, asyncio.CancelledError) as err:
+            if not isinstance(err, StopAsyncIteration):
+                await self.aclose()
+            raise
+
+    async def aclose(self):
+
+        tasks = list(self._tasks)
+        self._tasks.clear()
+        for task in self._finished.values():
+            if not task.cancelled():
+                task.exception()
+        self._finished.clear()
+        self._stop = self._next
+
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks)
+
+def aiter(sequence, start=0):
+
+    return AsyncIterator(sequence, start=start)
+
+def amap(coro_fn, sequence, concurrency=1, ordered=False, start=0,
+        stop=None):
+
+    return AsyncMap(coro_fn, sequence, concurrency=concurrency,
+            ordered=ordered, start=start, stop=stop)
@@ -1,2 +1,52 @@
-from seqgentools.algorithms.combinatorics import *
-from seqgentools.algorithms.hssgen import HSS
+import sys
+
+# public names of the algorithm modules; from Python 3.7 on a module is
+# only imported when one of its names is first accessed
+_modules = {
+    "combinatorics": ("nPr", "nCr", "nCRr", "Product", "SubProduct",
+        "Permutations", "Combinations", "Combinations_with_replacement",
+        "PermutationRange", "CombinationRange", "MultisetPermutations",
+        "MultisetCombinations", "Fibonacci"),
+    "partitions": ("stirling2", "bell", "npartitions", "SetPartitions",
+        "Assignments", "Compositions", "IntegerPartitions"),
+    "minchange": ("GrayProduct", "RevolvingDoorCombinations",
+        "SJTPermutations"),
+    "traversal": ("VanDerCorput", "Halton", "LatinHypercube"),
+    "dovetail": ("DiagonalProduct", "Interleave"),
+    "weighted": ("WeightedProduct",),
+    "symmetry": ("Necklaces", "Bracelets", "SortedProduct", "Orbits"),
+    "hssgen": ("HSS",),
+}
+
+_lazy = dict((name, "seqgentools.algorithms." + module)
+        for module, names in _modules.items() for name in names)
+
+# "import *" does not consult __getattr__, so the lazy names are listed
+__all__ = sorted(_lazy)
+
+if sys.version_info >= (3, 7):
+
+    def __getattr__(name):
+
+        if name not in _lazy:
+            raise AttributeError("module '%s' has no attribute '%s'"%(
+                __name__, name))
+
+        import importlib
+        value = getattr(importlib.import_module(_lazy[name]), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+
+        return sorted(set(globals()) | set(_lazy))
+
+else:
+    from seqgentools.algorithms.combinatorics import *
+    from seqgentools.algorithms.partitions import *
+    from seqgentools.algorithms.minchange import *
+    from seqgentools.algorithms.traversal import *
+    from seqgentools.algorithms.dovetail import *
+    from seqgentools.algorithms.weighted import *
+    from seqgentools.algorithms.symmetry import *
+    from seqgentools.algorithms.hssgen import HSS
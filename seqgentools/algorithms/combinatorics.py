@@ -5,9 +5,9 @@ from __future__ import (unicode_literals, print_function,
 
 import sys
 from math import factorial
-import copy
 
-from seqgentools.sequence import Sequence, Chain, INF
+from seqgentools.sequence import (Sequence, Chain, Range, Slice, Wrapper,
+        INF, InfiniteSequenceError, IndexNotFound, _not_found)
 
 _PY3 = sys.version_info >= (3, 0)
 
@@ -24,6 +24,94 @@ def nCr(n, r):
 def nCRr(n, r):
     return factorial(n+r-1) // (factorial(r) * factorial(n-1))
 
+def _multiset(sequence, counts=None):
+
+    # groups equal elements in first-appearance order
+    elems, mults, table = [], [], {}
+
+    _len = sequence.length()
+    if counts is None:
+        counts = [1] * _len
+    elif len(counts) != _len:
+        raise ValueError("The number of counts does not match the "
+                         "number of elements.")
+
+    for idx, cnt in enumerate(counts):
+        if not isinstance(cnt, (int, long)) or cnt < 0:
+            raise ValueError("Multiset counts must be non-negative "
+                             "integers: %s"%str(cnt))
+        val = sequence[idx]
+        pos = _locate(table, elems, val)
+        if pos is None:
+            pos = len(elems)
+            elems.append(val)
+            mults.append(0)
+            try:
+                table[val] = pos
+            except TypeError:
+                pass
+        mults[pos] += cnt
+
+    return tuple(elems), mults, table
+
+def _locate(table, elems, val):
+
+    try:
+        return table.get(val)
+    except TypeError:
+        for pos, elem in enumerate(elems):
+            if elem == val:
+                return pos
+
+def _arrangements(counts, r):
+
+    # ways[t] is the number of t-arrangements of a multiset, for t <= r
+    ways = [1] + [0] * r
+    for c in counts:
+        new = [0] * (r+1)
+        for t, w in enumerate(ways):
+            if w:
+                for j in range(min(c, r-t)+1):
+                    new[t+j] += w * nCr(t+j, j)
+        ways = new
+
+    return ways
+
+def _divide(ways, c, m):
+
+    # arrangements up to length m-c of the other elements once one of
+    # multiplicity c is set aside; its factor of the exponential
+    # generating function is divided out
+    rest = []
+    for t in range(m-c+1):
+        val, binom = ways[t], 1
+        for i in range(1, min(c, t)+1):
+            binom = binom * (t-i+1) // i
+            val -= binom * rest[t-i]
+        rest.append(val)
+    return rest
+
+def _consume(ways, c, rest, m):
+
+    # arrangements up to length m once an element of multiplicity c loses
+    # one copy: the generating function loses x**c/c! times rest
+    new, binom = list(ways[:m+1]), 1
+    for t in range(c, m+1):
+        new[t] -= binom * rest[t-c]
+        binom = binom * (t+1) // (t+1-c)
+    return new
+
+def _multiset_count(counts, r):
+
+    # number of r-arrangements of a multiset
+    if r == sum(counts):
+        total = factorial(r)
+        for c in counts:
+            total //= factorial(c)
+        return total
+
+    return _arrangements(counts, r)[r]
+
 class Product(Sequence):
 
     def __init__(self, *sequences, **kwargs):
@@ -52,15 +140,163 @@ class Product(Sequence):
 
         return tuple(product)
 
-    def copy(self, memo={}):
+    def index(self, val):
+
+        try:
+            val = tuple(val)
+        except TypeError:
+            val = None
+
+        if val is None or len(val) != self._dimension:
+            raise _not_found(self, val)
 
-        seqs = [copy.deepcopy(s, memo) for s in self._sequences]
-        return Product(*seqs)
+        index = 0
+        for item, _len, seq in zip(val, reversed(self._pool_lens),
+                reversed(self._pools)):
+            index = index * _len + seq.index(item)
+
+        return index
 
     def length(self):
 
         return reduce(lambda x, y: x*y, self._pool_lens)
 
+    def _pool(self, dim):
+
+        # pools are stored last dimension first
+        if not 0 <= dim < self._dimension:
+            raise IndexError("Product has no dimension %s."%str(dim))
+        return self._pools[self._dimension-dim-1]
+
+    def _coords(self, index):
+
+        coords = []
+        for _len in self._pool_lens:
+            index, coord = divmod(index, _len)
+            coords.append(coord)
+        coords.reverse()
+        return coords
+
+    def _position(self, dim, value):
+
+        return self._pool(dim).index(value)
+
+    def _subspace(self, positions):
+
+        return SubProduct(self, positions)
+
+    def fix(self, dim, value=None):
+
+        # dim is a dimension number, or a dict of dimension to value
+        values = dim if isinstance(dim, dict) else {dim: value}
+        positions = [Range(_len) for _len in reversed(self._pool_lens)]
+        for dim, value in values.items():
+            pos = self._position(dim, value)
+            positions[dim] = Range(pos, pos+1)
+        return self._subspace(positions)
+
+    def project(self, dims, base=0):
+
+        # dimensions outside dims keep their coordinates in self[base]
+        dims = set(dims)
+        for dim in dims:
+            self._pool(dim)
+        coords = self._coords(self._validate_index(base))
+        positions = []
+        for dim, (_len, coord) in enumerate(zip(reversed(self._pool_lens),
+                coords)):
+            if dim in dims:
+                positions.append(Range(_len))
+            else:
+                positions.append(Range(coord, coord+1))
+        return self._subspace(positions)
+
+    def restrict(self, dim, subseq):
+
+        self._pool(dim)
+        positions = [Range(_len) for _len in reversed(self._pool_lens)]
+        positions[dim] = Wrapper(tuple(self._position(dim, value) for value
+                in self._validate_sequence(subseq)))
+        return self._subspace(positions)
+
+class SubProduct(Product):
+
+    _derived = ("_pools", "_pool_lens")
+
+    def __init__(self, parent, positions):
+
+        # positions holds, per dimension, the parent pool positions that
+        # remain; pools of the parent are shared wherever possible
+        self._parent = parent
+        self._positions = positions
+
+        pools = []
+        for dim, pos in enumerate(positions):
+            pool = parent._pool(dim)
+            if type(pos) is Range:
+                if pos.length() == pool.length() and pos._start == 0:
+                    pools.append(pool)
+                else:
+                    pools.append(Slice(pool, slice(pos._start, pos._stop,
+                        pos._step)))
+            else:
+                pools.append(Wrapper(tuple(pool[p] for p in pos)))
+
+        super(SubProduct, self).__init__(*pools)
+
+    def _position(self, dim, value):
+
+        # view pools may be slices without index(); values are found in the
+        # parent pool and mapped through the positions of this view
+        pos = self._parent._position(dim, value)
+        try:
+            return self._positions[dim].index(pos)
+        except IndexNotFound:
+            raise _not_found(self, value)
+
+    def index(self, val):
+
+        # ranked in the parent, whose pools all support index(), and mapped
+        # back; values outside the remaining coordinates are not found
+        try:
+            return self.from_parent(self._parent.index(val))
+        except IndexNotFound:
+            raise _not_found(self, val)
+
+    def _subspace(self, positions):
+
+        # compose with the positions of this view so that nested views
+        # still translate to the original parent in one step
+        composed = []
+        for outer, inner in zip(self._positions, positions):
+            if type(outer) is Range and type(inner) is Range:
+                start = outer._start + outer._step * inner._start
+                step = outer._step * inner._step
+                composed.append(Range(start, start + step * inner.length(),
+                    step))
+            else:
+                composed.append(Wrapper(tuple(outer[p] for p in inner)))
+        return SubProduct(self._parent, composed)
+
+    def to_parent(self, index):
+
+        parent = 0
+        for pos, coord, _len in zip(self._positions, self._coords(index),
+                reversed(self._parent._pool_lens)):
+            parent = parent * _len + pos[coord]
+        return parent
+
+    def from_parent(self, index):
+
+        sub = 0
+        for pos, coord, _len in zip(self._positions,
+                self._parent._coords(index), reversed(self._pool_lens)):
+            try:
+                sub = sub * _len + pos.index(coord)
+            except IndexNotFound:
+                raise _not_found(self, index)
+        return sub
+
 class Permutations(Sequence):
 
     def __init__(self, sequence, r=None):
@@ -89,11 +325,6 @@ class Permutations(Sequence):
 
         return tuple(self._kth(index, self._sequence, self._r))
 
-    def copy(self, memo={}):
-
-        return Permutations(copy.deepcopy(self._sequence, memo),
-                r=self._r)
-
     def length(self):
 
         if self._r > self._n:
@@ -132,11 +363,6 @@ class Combinations(Sequence):
 
         return tuple(self._kth(index, self._sequence, self._r))
 
-    def copy(self, memo={}):
-
-        return Combinations(copy.deepcopy(self._sequence, memo),
-                self._r)
-
     def length(self):
 
         if self._r > self._n:
@@ -172,11 +398,6 @@ class Combinations_with_replacement(Sequence):
 
         return tuple(self._kth(index, self._sequence, self._r))
 
-    def copy(self, memo={}):
-
-        return Combinations_with_replacement(copy.deepcopy(self._sequence, memo),
-                self._r)
-
     def length(self):
 
         return nCRr(self._n, self._r)
@@ -202,10 +423,6 @@ class PermutationRange(Sequence):
 
         return self._chain[index]
 
-    def copy(self, memo={}):
-
-        return PermutationRange(copy.deepcopy(self._sequence, memo))
-
     def length(self):
 
         return self._chain.length()
@@ -231,90 +448,230 @@ class CombinationRange(Sequence):
 
         return self._chain[index]
 
-    def copy(self, memo={}):
+    def length(self):
+
+        return self._chain.length()
+
+class MultisetPermutations(Sequence):
 
-        return CombinationRange(copy.deepcopy(self._sequence, memo))
+    _derived = ("_table", "_ways")
+
+    def __init__(self, sequence, counts=None, r=None):
+
+        self._sequence = self._validate_sequence(sequence)
+
+        if self._sequence.length() == INF:
+            raise InfiniteSequenceError(self)
+
+        self._elems, self._counts, self._table = _multiset(
+                self._sequence, counts)
+
+        self._n = sum(self._counts)
+        self._r = self._n if r is None else r
+
+        if self._r < 0 or self._r > self._n:
+            self._len = 0
+        else:
+            self._len = _multiset_count(self._counts, self._r)
+
+        # arrangement counts by length, updated as elements are consumed
+        self._ways = None
+        if self._len and self._r < self._n:
+            self._ways = _arrangements(self._counts, self._r)
+
+    def _start(self):
+
+        return self._len if self._ways is None else self._ways
+
+    def _branches(self, counts, left, state, rests):
+
+        # yields each usable element with the number of arrangements that
+        # start with it; only the leading coefficient is needed per
+        # element, and elements of equal multiplicity share it
+        m = left - 1
+        for j, c in enumerate(counts):
+            if c > 0:
+                if self._ways is None:
+                    # multinomial of the remaining elements
+                    yield j, state * c // left
+                    continue
+                if c not in rests:
+                    rests[c] = _divide(state, c, m)
+                sub = state[m]
+                if m >= c:
+                    sub -= nCr(m, c) * rests[c][m-c]
+                yield j, sub
+
+    def _consumed(self, counts, j, left, state, rests):
+
+        # the state for the remaining positions once element j is used
+        if self._ways is None:
+            return state * counts[j] // left
+        return _consume(state, counts[j], rests[counts[j]], left-1)
+
+    def getitem(self, index):
+
+        counts = list(self._counts)
+        state, perm = self._start(), []
+
+        for left in range(self._r, 0, -1):
+            rests = {}
+            for j, sub in self._branches(counts, left, state, rests):
+                if index < sub:
+                    break
+                index -= sub
+            perm.append(self._elems[j])
+            state = self._consumed(counts, j, left, state, rests)
+            counts[j] -= 1
+
+        return tuple(perm)
+
+    def index(self, val):
+
+        val = tuple(val)
+        if len(val) != self._r or self._len == 0:
+            raise _not_found(self, val)
+
+        counts = list(self._counts)
+        state, rank = self._start(), 0
+
+        for left, item in zip(range(self._r, 0, -1), val):
+            pos = _locate(self._table, self._elems, item)
+            if pos is None or counts[pos] == 0:
+                raise _not_found(self, val)
+            rests = {}
+            for j, sub in self._branches(counts, left, state, rests):
+                if j == pos:
+                    break
+                rank += sub
+            state = self._consumed(counts, pos, left, state, rests)
+            counts[pos] -= 1
+
+        return rank
 
     def length(self):
 
-        return self._chain.length()
+        return self._len
+
+class MultisetCombinations(Sequence):
+
+    _derived = ("_table", "_ways")
+
+    def __init__(self, sequence, r, counts=None):
+
+        self._sequence = self._validate_sequence(sequence)
+
+        if self._sequence.length() == INF:
+            raise InfiniteSequenceError(self)
+
+        self._elems, self._counts, self._table = _multiset(
+                self._sequence, counts)
+
+        self._n = sum(self._counts)
+        self._r = r
+
+        # _ways[i][s]: number of ways to pick s items from elements i..k-1
+        k = len(self._counts)
+        self._ways = [[0] * (max(r, 0)+1) for _ in range(k+1)]
+        if r >= 0:
+            self._ways[k][0] = 1
+        for i in range(k-1, -1, -1):
+            below, above = self._ways[i+1], self._ways[i]
+            accum = 0
+            for s in range(r+1):
+                accum += below[s]
+                if s - self._counts[i] - 1 >= 0:
+                    accum -= below[s - self._counts[i] - 1]
+                above[s] = accum
+
+    def getitem(self, index):
+
+        comb, left = [], self._r
+
+        for i, c in enumerate(self._counts):
+            if left == 0:
+                break
+            for m in range(min(c, left), -1, -1):
+                sub = self._ways[i+1][left-m]
+                if index < sub:
+                    break
+                index -= sub
+            comb.extend([self._elems[i]] * m)
+            left -= m
+
+        return tuple(comb)
+
+    def index(self, val):
+
+        val = tuple(val)
+        if len(val) != self._r or self.length() == 0:
+            raise _not_found(self, val)
+
+        mults = [0] * len(self._counts)
+        prev = 0
+        for item in val:
+            pos = _locate(self._table, self._elems, item)
+            if pos is None or pos < prev:
+                raise _not_found(self, val)
+            mults[pos] += 1
+            prev = pos
+
+        rank, left = 0, self._r
+        for i, (c, m) in enumerate(zip(self._counts, mults)):
+            if m > c:
+                raise _not_found(self, val)
+            for more in range(min(c, left), m, -1):
+                rank += self._ways[i+1][left-more]
+            left -= m
+
+        return rank
+
+    def length(self):
+
+        return self._ways[0][self._r] if self._r >= 0 else 0
 
 class Fibonacci(Sequence):
 
-    def __init__(self, cache_limit=1024):
+    _seed = {0: 0, 1: 1, 2: 1, 3: 2, 4: 3, 5: 5,
+             6: 8, 7: 13, 8: 21, 9: 34, 10: 55}
+
+    def __init__(self):
 
-        self._cache = {0: 0, 1: 1, 2: 1, 3: 2, 4: 3, 5: 5,
-                       6: 8, 7: 13, 8: 21, 9: 34, 10: 55}
-        self._cache_limit = cache_limit
+        self._cache = dict(self._seed)
 
     def getitem(self, index):
 
         if not isinstance(index, int) or index < 0:
             raise ValueError("Invalid fibonacci index: %s."%str(index))
 
-        if index in self._cache:
-            return self._cache[index]
+        cache = self._cache
+        value = cache.get(index)
+        if value is not None:
+            return value
+        elif index < 2:
+            return index
 
+        # fast doubling in locals; the cache only receives finished
+        # entries and stops growing at the limit
+        limit = self._cache_limit
         kp, k, km = 1, 1, 0
-
-        if self._cache_limit is not None:
-            n = 1
-            for bit in bin(index)[3:]:
-                n *= 2
-                if bit == '1':
-                    n += 1
-
-                    if n-1 in self._cache:
-                        km = self._cache[n-1]
-                    else:
-                        km = (kp+km)*k
-                        self._cache[n-1] = km
-
-                    if n in self._cache:
-                        k = self._cache[n]
-                    else:
-                        k = kp*kp+k*k
-                        self._cache[n] = k
-
-                    if n+1 in self._cache:
-                        kp = self._cache[n+1]
-                    else:
-                        kp = k + km
-                        self._cache[n+1] = kp
-                else:
-                    precalc = k*k
-
-                    if n in self._cache:
-                        k = self._cache[n]
-                    else:
-                        k = (kp+km)*k
-                        self._cache[n] = k
-
-                    if n-1 in self._cache:
-                        km = self._cache[n-1]
-                    else:
-                        km = precalc+km*km
-                        self._cache[n-1] = km
-
-                    if n+1 in self._cache:
-                        kp = self._cache[n+1]
-                    else:
-                        kp = kp*kp+precalc
-                        self._cache[n+1] = kp
-
-                if len(self._cache) > self._cache_limit-2:
-                    self._cache_limit = None
-        else:
-            for bit in bin(index)[3:]:
-                precalc = k*k
-                kp, k, km = kp*kp+precalc, (kp+km)*k, precalc+km*km
-                if bit == '1':
-                    kp, k, km = kp+k, kp, k
+        n = 1
+        for bit in bin(index)[3:]:
+            precalc = k*k
+            kp, k, km = kp*kp+precalc, (kp+km)*k, precalc+km*km
+            n *= 2
+            if bit == '1':
+                kp, k, km = kp+k, kp, k
+                n += 1
+            if limit is not None and len(cache) < limit:
+                cache[n-1], cache[n], cache[n+1] = km, k, kp
         return k
 
-    def copy(self, memo={}):
+    def copy(self, memo=None):
 
-        return Fibonacci(cache_limit=self._cache_limit)
+        obj = super(Fibonacci, self).copy(memo=memo)
+        obj._cache = dict(self._seed)
+        return obj
 
     def length(self):
 
@@ -0,0 +1,235 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, print_function,
+        division)
+
+import sys
+
+from seqgentools.sequence import (Sequence, INF, IndexNotFound,
+        _not_found)
+
+_PY3 = sys.version_info >= (3, 0)
+
+if _PY3:
+    from functools import reduce
+    long = int
+
+def _iroot(n, k):
+
+    # largest integer r with r**k <= n, exact for arbitrarily large n
+    if n < 2 or k == 1:
+        return n
+    root = 1 << -(-n.bit_length() // k)
+    while True:
+        smaller = ((k-1) * root + n // root**(k-1)) // k
+        if smaller >= root:
+            break
+        root = smaller
+    while root**k > n:
+        root -= 1
+    return root
+
+def _isqrt(n):
+
+    return _iroot(n, 2)
+
+def _szudzik_unpair(index, k):
+
+    # points are enumerated by shells of equal maximum coordinate; inside
+    # shell s, block j holds the points whose first coordinate equal to s
+    # is at position j, with the latest position first
+    shell = _iroot(index, k)
+    offset = index - shell**k
+    for pos in range(k-1, -1, -1):
+        size = shell**pos * (shell+1)**(k-1-pos)
+        if offset < size:
+            break
+        offset -= size
+
+    coords = [shell] * k
+    for dim in range(k-1, -1, -1):
+        if dim != pos:
+            radix = shell if dim < pos else shell + 1
+            offset, coords[dim] = divmod(offset, radix)
+    return coords
+
+def _szudzik_pair(coords):
+
+    k = len(coords)
+    shell = max(coords)
+    pos = coords.index(shell)
+
+    index = shell**k
+    for prev in range(k-1, pos, -1):
+        index += shell**prev * (shell+1)**(k-1-prev)
+
+    offset = 0
+    for dim in range(k):
+        if dim != pos:
+            radix = shell if dim < pos else shell + 1
+            offset = offset * radix + coords[dim]
+    return index + offset
+
+def _cantor_unpair(index, k):
+
+    # the two dimensional pairing nested to the right
+    coords = []
+    for _ in range(k-1):
+        diag = (_isqrt(8 * index + 1) - 1) // 2
+        second = index - diag * (diag+1) // 2
+        coords.append(diag - second)
+        index = second
+    coords.append(index)
+    return coords
+
+def _cantor_pair(coords):
+
+    index = coords[-1]
+    for coord in reversed(coords[:-1]):
+        diag = coord + index
+        index = diag * (diag+1) // 2 + index
+    return index
+
+_PAIRINGS = {
+    "szudzik": (_szudzik_unpair, _szudzik_pair),
+    "cantor": (_cantor_unpair, _cantor_pair),
+}
+
+class DiagonalProduct(Sequence):
+
+    def __init__(self, *sequences, **kwargs):
+
+        pairing = kwargs.pop("pairing", "szudzik")
+        if pairing not in _PAIRINGS:
+            raise ValueError("Unknown pairing: '%s'."%pairing)
+
+        self._pairing = pairing
+        self._pools = [self._validate_sequence(seq) for seq in sequences]
+        self._pool_lens = [seq.length() for seq in self._pools]
+        self._dimension = len(self._pools)
+
+        # finite pools only vary the fastest changing part of an index, the
+        # infinite ones are dovetailed by the pairing function
+        self._finite = [dim for dim, _len in enumerate(self._pool_lens)
+                if _len != INF]
+        self._infinite = [dim for dim, _len in enumerate(self._pool_lens)
+                if _len == INF]
+        self._block = reduce(lambda x, y: x*y,
+                [self._pool_lens[dim] for dim in self._finite], 1)
+
+    def getitem(self, index):
+
+        product = [None] * self._dimension
+
+        index, offset = divmod(index, self._block)
+        for dim in reversed(self._finite):
+            offset, coord = divmod(offset, self._pool_lens[dim])
+            product[dim] = self._pools[dim][coord]
+
+        if self._infinite:
+            unpair = _PAIRINGS[self._pairing][0]
+            for dim, coord in zip(self._infinite,
+                    unpair(index, len(self._infinite))):
+                product[dim] = self._pools[dim][coord]
+
+        return tuple(product)
+
+    def index(self, val):
+
+        try:
+            val = tuple(val)
+        except TypeError:
+            val = None
+
+        if val is None or len(val) != self._dimension:
+            raise _not_found(self, val)
+
+        try:
+            coords = [seq.index(item) for item, seq in zip(val, self._pools)]
+        except (IndexNotFound, NotImplementedError):
+            raise _not_found(self, val)
+
+        offset = 0
+        for dim in self._finite:
+            offset = offset * self._pool_lens[dim] + coords[dim]
+
+        index = 0
+        if self._infinite:
+            pair = _PAIRINGS[self._pairing][1]
+            index = pair([coords[dim] for dim in self._infinite])
+
+        return index * self._block + offset
+
+    def length(self):
+
+        if self._block == 0:
+            return 0
+        elif self._infinite:
+            return INF
+        else:
+            return self._block
+
+class Interleave(Sequence):
+
+    _derived = ("_phases",)
+
+    def __init__(self, *sequences):
+
+        self._sequences = [self._validate_sequence(seq)
+                for seq in sequences]
+        self._sequence_lens = [seq.length() for seq in self._sequences]
+
+        # rounds split into phases in which the same sequences take turns;
+        # each phase is (first item, first round, last round, members)
+        self._phases = []
+        item, first = 0, 0
+        for last in sorted(set(self._sequence_lens)):
+            members = [idx for idx, _len in enumerate(self._sequence_lens)
+                    if _len >= last]
+            if last > first:
+                self._phases.append((item, first, last, members))
+                if last != INF:
+                    item += (last - first) * len(members)
+            first = last
+
+    def _locate(self, index):
+
+        for item, first, last, members in reversed(self._phases):
+            if index >= item:
+                turn, member = divmod(index - item, len(members))
+                return members[member], first + turn
+
+    def getitem(self, index):
+
+        seq, pos = self._locate(index)
+        return self._sequences[seq][pos]
+
+    def index(self, val):
+
+        # the first occurrence is the earliest one among all sequences
+        found = None
+        for seq, sequence in enumerate(self._sequences):
+            try:
+                pos = sequence.index(val)
+            except (IndexNotFound, NotImplementedError):
+                continue
+            for item, first, last, members in self._phases:
+                if first <= pos < last:
+                    index = (item + (pos - first) * len(members) +
+                            members.index(seq))
+                    if found is None or index < found:
+                        found = index
+                    break
+
+        if found is None:
+            raise _not_found(self, val)
+        return found
+
+    def length(self):
+
+        if not self._phases:
+            return 0
+        item, first, last, members = self._phases[-1]
+        if last == INF:
+            return INF
+        return item + (last - first) * len(members)
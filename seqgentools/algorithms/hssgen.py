@@ -13,8 +13,5 @@ class HSS(Sequence):
     def getitem(self, index):
         pass
 
-    def copy(self, memo={}):
-        pass
-
     def length(self):
         pass
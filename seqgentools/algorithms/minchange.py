@@ -0,0 +1,325 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, print_function,
+        division)
+
+import sys
+
+from seqgentools.sequence import (Sequence, INF, InfiniteSequenceError,
+        IndexNotFound, _not_found, _positions)
+from seqgentools.algorithms.combinatorics import nPr, nCr
+
+_PY3 = sys.version_info >= (3, 0)
+
+if _PY3:
+    from functools import reduce
+
+class GrayProduct(Sequence):
+
+    _derived = ("_strides",)
+
+    def __init__(self, *sequences, **kwargs):
+
+        repeat = kwargs.pop("repeat", 1)
+
+        self._pools = []
+        for _ in range(repeat):
+            for seq in sequences:
+                self._pools.append(self._validate_sequence(seq))
+
+        self._pool_lens = [seq.length() for seq in self._pools]
+        self._dimension = len(self._pools)
+
+        if any(_l == INF for _l in self._pool_lens):
+            raise InfiniteSequenceError(self)
+
+        # number of points spanned by one step of each dimension
+        self._strides = [1] * self._dimension
+        for dim in range(self._dimension-2, -1, -1):
+            self._strides[dim] = (self._strides[dim+1] *
+                    self._pool_lens[dim+1])
+
+    def _digits(self, index):
+
+        digits = []
+        for stride in self._strides:
+            digit, index = divmod(index, stride)
+            if digit % 2:
+                index = stride - 1 - index
+            digits.append(digit)
+        return digits
+
+    def getitem(self, index):
+
+        return tuple(seq[digit] for seq, digit in
+                zip(self._pools, self._digits(index)))
+
+    def index(self, val):
+
+        val = tuple(val)
+        if len(val) != self._dimension:
+            raise _not_found(self, val)
+
+        rank = 0
+        for dim in range(self._dimension-1, -1, -1):
+            try:
+                digit = self._pools[dim].index(val[dim])
+            except (IndexNotFound, NotImplementedError):
+                raise _not_found(self, val)
+            if digit % 2:
+                rank = self._strides[dim] - 1 - rank
+            rank += digit * self._strides[dim]
+
+        return rank
+
+    def iterchanges(self, start=0, stop=None):
+
+        # yields (point, dim) where dim is the only coordinate that differs
+        # from the previous point, or None for the first point
+        _len = self.length()
+        stop = _len if stop is None else min(stop, _len)
+        if start >= stop:
+            return
+
+        digits = self._digits(start)
+        counters, index = [], start
+        for _len in reversed(self._pool_lens):
+            index, counter = divmod(index, _len)
+            counters.append(counter)
+        counters.reverse()
+
+        dirs, parity = [], 0
+        for digit in digits:
+            dirs.append(-1 if parity else 1)
+            parity = (parity + digit) % 2
+
+        point = [seq[digit] for seq, digit in zip(self._pools, digits)]
+        yield tuple(point), None
+
+        for _ in range(start+1, stop):
+            dim = self._dimension - 1
+            while counters[dim] == self._pool_lens[dim] - 1:
+                counters[dim] = 0
+                dirs[dim] = -dirs[dim]
+                dim -= 1
+            counters[dim] += 1
+            digits[dim] += dirs[dim]
+            point[dim] = self._pools[dim][digits[dim]]
+            yield tuple(point), dim
+
+    def length(self):
+
+        return reduce(lambda x, y: x*y, self._pool_lens, 1)
+
+class RevolvingDoorCombinations(Sequence):
+
+    def __init__(self, sequence, r):
+
+        self._sequence = self._validate_sequence(sequence)
+
+        self._n = self._sequence.length()
+
+        if self._n == INF:
+            raise InfiniteSequenceError(self)
+
+        self._r = r
+
+    def _positions(self, index):
+
+        # combinations without the last element come first, followed by
+        # the reversed combinations that include it
+        combo = []
+        n, k = self._n, self._r
+        total = nCr(n, k)
+        while k > 0:
+            if n == k:
+                combo.extend(range(k-1, -1, -1))
+                break
+            without = total * (n-k) // n
+            if index < without:
+                total = without
+            else:
+                combo.append(n-1)
+                index = total - 1 - index
+                total = total * k // n
+                k -= 1
+            n -= 1
+
+        combo.reverse()
+        return combo
+
+    def _advance(self, combo):
+
+        # Knuth's algorithm R: moves combo, ascending positions padded with
+        # a leading None and a trailing n, to its successor in place and
+        # returns the (removed, added) positions
+        r = self._r
+        if r % 2:
+            if combo[1] + 1 < combo[2]:
+                combo[1] += 1
+                return combo[1] - 1, combo[1]
+            decrease = True
+        else:
+            if combo[1] > 0:
+                combo[1] -= 1
+                return combo[1] + 1, combo[1]
+            decrease = False
+
+        j = 2
+        while j <= r:
+            if decrease and combo[j] >= j:
+                removed, added = combo[j], j - 2
+                combo[j], combo[j-1] = combo[j-1], j - 2
+                return removed, added
+            elif not decrease and combo[j] + 1 < combo[j+1]:
+                removed, added = j - 2, combo[j] + 1
+                combo[j-1], combo[j] = combo[j], combo[j] + 1
+                return removed, added
+            decrease = not decrease
+            j += 1
+
+    def getitem(self, index):
+
+        return tuple(self._sequence[pos] for pos in self._positions(index))
+
+    def index(self, val):
+
+        val = tuple(val)
+        # items follow pool order, so each takes the first occurrence past
+        # the previous one
+        positions, low = set(), 0
+        for elem, pos in zip(val, _positions(self, self._sequence, val,
+                self._r)):
+            while pos < low or self._sequence[pos] != elem:
+                pos = low if pos < low else pos + 1
+                if pos >= self._n:
+                    raise _not_found(self, val)
+            positions.add(pos)
+            low = pos + 1
+
+        rank, sign = 0, 1
+        n, k = self._n, self._r
+        total = nCr(n, k)
+        while 0 < k < n:
+            if n-1 in positions:
+                rank += sign * (total - 1)
+                sign = -sign
+                total = total * k // n
+                k -= 1
+            else:
+                total = total * (n-k) // n
+            n -= 1
+
+        return rank
+
+    def iterchanges(self, start=0, stop=None):
+
+        # yields (combination, (removed, added)) where a single element is
+        # swapped against the previous combination
+        _len = self.length()
+        stop = _len if stop is None else min(stop, _len)
+        if start >= stop:
+            return
+
+        combo = [None] + self._positions(start) + [self._n]
+        point = [self._sequence[pos] for pos in combo[1:-1]]
+        yield tuple(point), None
+
+        for _ in range(start+1, stop):
+            removed, added = self._advance(combo)
+            point = [self._sequence[pos] for pos in combo[1:-1]]
+            yield (tuple(point),
+                    (self._sequence[removed], self._sequence[added]))
+
+    def length(self):
+
+        if self._r < 0 or self._r > self._n:
+            return 0
+        else:
+            return nCr(self._n, self._r)
+
+class SJTPermutations(Sequence):
+
+    def __init__(self, sequence):
+
+        self._sequence = self._validate_sequence(sequence)
+
+        self._n = self._sequence.length()
+
+        if self._n == INF:
+            raise InfiniteSequenceError(self)
+
+    def _state(self, index):
+
+        # offsets of each element among the smaller ones, and the rank of
+        # the permutation of the smaller elements that it sweeps over
+        offsets, blocks = [0] * self._n, [0] * self._n
+        for elem in range(self._n-1, 0, -1):
+            index, offsets[elem] = divmod(index, elem+1)
+            blocks[elem] = index
+
+        perm = [0] if self._n else []
+        for elem in range(1, self._n):
+            if blocks[elem] % 2:
+                perm.insert(offsets[elem], elem)
+            else:
+                perm.insert(elem - offsets[elem], elem)
+
+        return perm, offsets, blocks
+
+    def getitem(self, index):
+
+        perm = self._state(index)[0]
+        return tuple(self._sequence[pos] for pos in perm)
+
+    def index(self, val):
+
+        val = tuple(val)
+        perm = _positions(self, self._sequence, val, self._n, True)
+
+        rank = 0
+        for elem in range(1, self._n):
+            pos = sum(1 for p in perm[:perm.index(elem)] if p < elem)
+            if rank % 2:
+                rank = rank * (elem+1) + pos
+            else:
+                rank = rank * (elem+1) + elem - pos
+
+        return rank
+
+    def iterchanges(self, start=0, stop=None):
+
+        # yields (permutation, pos) where the items at pos and pos+1 are
+        # swapped against the previous permutation
+        _len = self.length()
+        stop = _len if stop is None else min(stop, _len)
+        if start >= stop:
+            return
+
+        perm, offsets, blocks = self._state(start)
+        where = [0] * self._n
+        for pos, elem in enumerate(perm):
+            where[elem] = pos
+        dirs = [1 if block % 2 else -1 for block in blocks]
+
+        point = [self._sequence[pos] for pos in perm]
+        yield tuple(point), None
+
+        for _ in range(start+1, stop):
+            elem = self._n - 1
+            while offsets[elem] == elem:
+                offsets[elem] = 0
+                dirs[elem] = -dirs[elem]
+                elem -= 1
+            offsets[elem] += 1
+            pos = where[elem]
+            other = perm[pos + dirs[elem]]
+            perm[pos], perm[pos + dirs[elem]] = other, elem
+            where[elem], where[other] = pos + dirs[elem], pos
+            point[pos], point[pos + dirs[elem]] = (point[pos + dirs[elem]],
+                    point[pos])
+            yield tuple(point), min(pos, pos + dirs[elem])
+
+    def length(self):
+
+        return nPr(self._n, self._n)
@@ -0,0 +1,390 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, print_function,
+        division)
+
+import sys
+
+from seqgentools.sequence import (Sequence, INF, InfiniteSequenceError,
+        IndexNotFound, _not_found)
+from seqgentools.algorithms.combinatorics import nCr
+
+_PY3 = sys.version_info >= (3, 0)
+
+if _PY3:
+    long = int
+
+_tables = {}
+
+def _table(name, n, k, build):
+
+    key = (name, n, k)
+    if key not in _tables:
+        _tables[key] = build(n, k)
+    return _tables[key]
+
+def _growth_table(n, k):
+
+    # tails[r][m]: number of ways to complete a restricted growth string
+    # with r more positions when m blocks are already open
+    tails = [[0] * (n+2) for _ in range(n+1)]
+    for m in range(n+2):
+        tails[0][m] = 1 if k is None or m == k else 0
+    for r in range(1, n+1):
+        for m in range(n+1):
+            grow = tails[r-1][m+1] if k is None or m < k else 0
+            tails[r][m] = m * tails[r-1][m] + grow
+    return tails
+
+def _surjection_table(n, k):
+
+    # tails[r][u]: number of ways to label r more positions when u of the
+    # k labels are already used and every label has to be used
+    tails = [[0] * (k+2) for _ in range(n+1)]
+    tails[0][k] = 1
+    for r in range(1, n+1):
+        for u in range(k+1):
+            tails[r][u] = u * tails[r-1][u] + (k-u) * tails[r-1][u+1]
+    return tails
+
+def _partition_table(n, k):
+
+    # parts[m][b]: number of partitions of m with parts of at most b; when
+    # k is given parts[m][b][j] counts those with exactly j parts
+    if k is None:
+        parts = [[0] * (n+1) for _ in range(n+1)]
+        for b in range(n+1):
+            parts[0][b] = 1
+        for m in range(1, n+1):
+            for b in range(1, n+1):
+                parts[m][b] = parts[m][b-1]
+                if m >= b:
+                    parts[m][b] += parts[m-b][b]
+    else:
+        parts = [[[0] * (k+1) for _ in range(n+1)] for _ in range(n+1)]
+        for b in range(n+1):
+            parts[0][b][0] = 1
+        for m in range(1, n+1):
+            for b in range(1, n+1):
+                for j in range(1, k+1):
+                    parts[m][b][j] = parts[m][b-1][j]
+                    if m >= b:
+                        parts[m][b][j] += parts[m-b][b][j-1]
+    return parts
+
+def stirling2(n, k):
+
+    if n < 0 or k < 0:
+        return 0
+    return _table("growth", n, k, _growth_table)[n][0]
+
+def bell(n):
+
+    if n < 0:
+        return 0
+    return _table("growth", n, None, _growth_table)[n][0]
+
+def npartitions(n, k=None):
+
+    if n < 0 or (k is not None and (k < 0 or k > n)):
+        return 0
+    parts = _table("partition", n, k, _partition_table)
+    return parts[n][n] if k is None else parts[n][n][k]
+
+class _Grouping(Sequence):
+
+    _derived = ("_tails",)
+
+    # blocks of a set partition are ordered by their first element
+    _ordered = False
+
+    def _positions(self, val):
+
+        # maps blocks of elements back to a label per element position.
+        # Each block lists its elements in position order, so positions are
+        # matched one by one to the next pending element of a block; with
+        # repeated elements several blocks may match, and the lowest label
+        # is tried first so that the first occurrence of val is found
+        try:
+            blocks = [tuple(block) for block in val]
+        except TypeError:
+            raise _not_found(self, val)
+
+        items = [self._sequence[pos] for pos in range(self._n)]
+        if sum(len(block) for block in blocks) != self._n:
+            raise _not_found(self, val)
+
+        labels, pending, failed = [], [0] * len(blocks), set()
+        trial = 0
+        while len(labels) < self._n:
+            item, found = items[len(labels)], None
+            if tuple(pending) not in failed:
+                for label in range(trial, len(blocks)):
+                    done = pending[label]
+                    if (done < len(blocks[label]) and
+                            blocks[label][done] == item and not
+                            (self._ordered and done == 0 and label > 0 and
+                            pending[label-1] == 0)):
+                        found = label
+                        break
+            if found is None:
+                # every label was tried from this state; backtrack
+                failed.add(tuple(pending))
+                if not labels:
+                    raise _not_found(self, val)
+                trial = labels.pop()
+                pending[trial] -= 1
+                trial += 1
+            else:
+                pending[found] += 1
+                labels.append(found)
+                trial = 0
+
+        return blocks, labels
+
+    def _blocks(self, labels, nblocks):
+
+        blocks = [[] for _ in range(nblocks)]
+        for pos, label in enumerate(labels):
+            blocks[label].append(self._sequence[pos])
+        return tuple(tuple(block) for block in blocks)
+
+class SetPartitions(_Grouping):
+
+    _ordered = True
+
+    def __init__(self, sequence, k=None):
+
+        self._sequence = self._validate_sequence(sequence)
+
+        self._n = self._sequence.length()
+
+        if self._n == INF:
+            raise InfiniteSequenceError(self)
+
+        self._k = k
+        self._tails = _table("growth", self._n, k, _growth_table)
+
+    def getitem(self, index):
+
+        labels, m = [], 0
+        for r in range(self._n, 0, -1):
+            sub = self._tails[r-1][m]
+            if index < m * sub:
+                labels.append(index // sub)
+                index %= sub
+            else:
+                labels.append(m)
+                index -= m * sub
+                m += 1
+
+        return self._blocks(labels, m)
+
+    def index(self, val):
+
+        blocks, labels = self._positions(val)
+
+        if ((self._k is not None and len(blocks) != self._k) or
+                not all(blocks)):
+            raise _not_found(self, val)
+
+        rank, m = 0, 0
+        for r, label in zip(range(self._n, 0, -1), labels):
+            sub = self._tails[r-1][m]
+            if label < m:
+                rank += label * sub
+            elif label == m:
+                rank += m * sub
+                m += 1
+            else:
+                # blocks are not ordered by their first element
+                raise _not_found(self, val)
+
+        return rank
+
+    def length(self):
+
+        return self._tails[self._n][0]
+
+class Assignments(_Grouping):
+
+    def __init__(self, sequence, k):
+
+        self._sequence = self._validate_sequence(sequence)
+
+        self._n = self._sequence.length()
+
+        if self._n == INF:
+            raise InfiniteSequenceError(self)
+
+        self._k = k
+        self._tails = _table("surjection", self._n, k, _surjection_table)
+
+    def getitem(self, index):
+
+        labels, used = [], [False] * self._k
+        nused = 0
+        for r in range(self._n, 0, -1):
+            for label in range(self._k):
+                if used[label]:
+                    sub = self._tails[r-1][nused]
+                else:
+                    sub = self._tails[r-1][nused+1]
+                if index < sub:
+                    break
+                index -= sub
+            labels.append(label)
+            if not used[label]:
+                used[label] = True
+                nused += 1
+
+        return self._blocks(labels, self._k)
+
+    def index(self, val):
+
+        blocks, labels = self._positions(val)
+
+        if len(blocks) != self._k or not all(blocks):
+            raise _not_found(self, val)
+
+        rank, used = 0, [False] * self._k
+        nused = 0
+        for r, actual in zip(range(self._n, 0, -1), labels):
+            for label in range(actual):
+                if used[label]:
+                    rank += self._tails[r-1][nused]
+                else:
+                    rank += self._tails[r-1][nused+1]
+            if not used[actual]:
+                used[actual] = True
+                nused += 1
+
+        return rank
+
+    def length(self):
+
+        return self._tails[self._n][0]
+
+class Compositions(Sequence):
+
+    def __init__(self, n, k=None):
+
+        self._n = n
+        self._k = k
+
+    def _count(self, m, j):
+
+        if j is None:
+            return 1 if m == 0 else 2 ** (m-1)
+        elif m == 0 or j == 0:
+            return 1 if m == j else 0
+        elif j < 0 or j > m:
+            return 0
+        else:
+            return nCr(m-1, j-1)
+
+    def getitem(self, index):
+
+        parts, m, j = [], self._n, self._k
+        while m > 0:
+            rest = None if j is None else j - 1
+            for part in range(1, m+1):
+                sub = self._count(m-part, rest)
+                if index < sub:
+                    break
+                index -= sub
+            parts.append(part)
+            m, j = m - part, rest
+
+        return tuple(parts)
+
+    def index(self, val):
+
+        try:
+            val = tuple(val)
+        except TypeError:
+            raise _not_found(self, val)
+
+        if (any(not isinstance(p, (int, long)) or p < 1 for p in val) or
+                sum(val) != self._n or
+                (self._k is not None and len(val) != self._k)):
+            raise _not_found(self, val)
+
+        rank, m, j = 0, self._n, self._k
+        for part in val:
+            rest = None if j is None else j - 1
+            for smaller in range(1, part):
+                rank += self._count(m-smaller, rest)
+            m, j = m - part, rest
+
+        return rank
+
+    def length(self):
+
+        if self._n < 0:
+            return 0
+        return self._count(self._n, self._k)
+
+class IntegerPartitions(Sequence):
+
+    _derived = ("_parts",)
+
+    def __init__(self, n, k=None):
+
+        self._n = n
+        self._k = k
+
+        if n >= 0 and (k is None or 0 <= k <= n):
+            self._parts = _table("partition", n, k, _partition_table)
+        else:
+            self._parts = None
+
+    def _count(self, m, b, j):
+
+        if j is None:
+            return self._parts[m][b]
+        return self._parts[m][b][j] if j >= 0 else 0
+
+    def getitem(self, index):
+
+        parts, m, b, j = [], self._n, self._n, self._k
+        while m > 0:
+            rest = None if j is None else j - 1
+            for part in range(1, min(b, m)+1):
+                sub = self._count(m-part, part, rest)
+                if index < sub:
+                    break
+                index -= sub
+            parts.append(part)
+            m, b, j = m - part, part, rest
+
+        return tuple(parts)
+
+    def index(self, val):
+
+        try:
+            val = tuple(val)
+        except TypeError:
+            raise _not_found(self, val)
+
+        if (self._parts is None or
+                any(not isinstance(p, (int, long)) or p < 1 for p in val) or
+                any(p < q for p, q in zip(val, val[1:])) or
+                sum(val) != self._n or
+                (self._k is not None and len(val) != self._k)):
+            raise _not_found(self, val)
+
+        rank, m, j = 0, self._n, self._k
+        for part in val:
+            rest = None if j is None else j - 1
+            for smaller in range(1, part):
+                rank += self._count(m-smaller, smaller, rest)
+            m, j = m - part, rest
+
+        return rank
+
+    def length(self):
+
+        if self._parts is None:
+            return 0
+        return self._count(self._n, self._n, self._k)
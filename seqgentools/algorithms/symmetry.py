@@ -0,0 +1,531 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, print_function,
+        division)
+
+import bisect
+
+from seqgentools.sequence import (Sequence, INF, InfiniteSequenceError,
+        _not_found, _positions)
+from seqgentools.algorithms.combinatorics import Product
+
+def _phi(n):
+
+    result, p = n, 2
+    while p * p <= n:
+        if n % p == 0:
+            while n % p == 0:
+                n //= p
+            result -= result // p
+        p += 1
+    if n > 1:
+        result -= result // n
+    return result
+
+def _min_rotation(word):
+
+    return min(word[i:] + word[:i] for i in range(len(word) or 1))
+
+def _necklace_count(a, n):
+
+    if n == 0:
+        return 1
+    return sum(_phi(n // d) * a**d for d in range(1, n+1) if n % d == 0) // n
+
+def _expected(word):
+
+    # the automaton of prefixes of word that never reads a character
+    # smaller than the one a matching prefix expects: per state, the
+    # largest expected character and the state it extends to
+    n = len(word)
+    border = [0] * (n+1)
+    k = 0
+    for j in range(1, n):
+        while k and word[j] != word[k]:
+            k = border[k]
+        if word[j] == word[k]:
+            k += 1
+        border[j+1] = k
+
+    expected = []
+    for state in range(n+1):
+        chain, j = [], state
+        while True:
+            if j < n:
+                chain.append(j)
+            if j == 0:
+                break
+            j = border[j]
+        # only the largest expected character may extend a prefix, larger
+        # ones restart the match
+        highest = max(word[j] for j in chain)
+        target = [j for j in chain if word[j] == highest][0] + 1
+        expected.append((highest, target))
+    return expected
+
+def _cyclic_count(word, a):
+
+    # number of rotation classes whose rotations are all >= word; by
+    # Burnside, words of period d are counted as closed walks of length d
+    # in the prefix automaton of word
+    n = len(word)
+    rows = []
+    for highest, target in _expected(word):
+        moves = {target: 1}
+        moves[0] = moves.get(0, 0) + a - highest - 1
+        rows.append(moves)
+
+    total, power = 0, [[int(i == j) for j in range(n+1)] for i in range(n+1)]
+    for d in range(1, n+1):
+        power = [_row_times(prow, rows, n) for prow in power]
+        if n % d == 0:
+            total += _phi(n // d) * sum(power[i][i] for i in range(n+1))
+    return total // n
+
+def _dihedral_count(word, a):
+
+    # number of dihedral classes whose images are all >= word, by Burnside
+    # as in _cyclic_count. A rotation fixes words that close a walk both
+    # forwards and backwards, so walks run on pairs of states where the
+    # second one follows the transitions in reverse. A reflection fixes
+    # words that mirror around its axis; reversals are then rotations, and
+    # walks on pairs read both halves from the axis outwards
+    n = len(word)
+    size = (n+1) ** 2
+    expected = _expected(word)
+
+    # single[i][j]: characters that move state i to state j
+    single = [dict() for _ in range(n+1)]
+    sources = [[[] for _ in range(n+1)] for _ in range(a)]
+    for state, (highest, target) in enumerate(expected):
+        for char in range(highest, a):
+            nxt = target if char == highest else 0
+            single[state][nxt] = single[state].get(nxt, 0) + 1
+            sources[char][nxt].append(state)
+
+    rows = []
+    for first, (highest, target) in enumerate(expected):
+        for second in range(n+1):
+            moves = {}
+            for char in range(highest, a):
+                nxt = (target if char == highest else 0) * (n+1)
+                for prev in sources[char][second]:
+                    moves[nxt+prev] = moves.get(nxt+prev, 0) + 1
+            rows.append(moves)
+
+    diagonal = [state * (n+2) for state in range(n+1)]
+    crossing = dict((first * (n+1) + second, count) for first in range(n+1)
+            for second, count in single[first].items())
+    reversed_crossing = dict((second * (n+1) + first, count) for first in
+            range(n+1) for second, count in single[first].items())
+
+    def walks(start, steps, end):
+        vec = [0] * size
+        for pair, count in start.items():
+            vec[pair] += count
+        for _ in range(steps):
+            vec = _row_times(vec, rows, size-1)
+        return sum(vec[pair] * count for pair, count in end.items())
+
+    total, power = 0, [[int(i == j) for j in range(size)]
+            for i in range(size)]
+    for d in range(1, n+1):
+        power = [_row_times(prow, rows, size-1) for prow in power]
+        if n % d == 0:
+            total += _phi(n // d) * sum(power[i][i] for i in range(size))
+
+    ends = dict((pair, 1) for pair in diagonal)
+    if n % 2:
+        total += n * walks(ends, n // 2, crossing)
+    else:
+        total += n // 2 * walks(ends, n // 2, ends)
+        total += n // 2 * walks(reversed_crossing, n//2 - 1, crossing)
+    return total // (2*n)
+
+def _row_times(prow, rows, n):
+
+    out = [0] * (n+1)
+    for mid, count in enumerate(prow):
+        if count:
+            for target, moves in rows[mid].items():
+                out[target] += count * moves
+    return out
+
+class _Words(Sequence):
+
+    # words over the positions of a sequence, one per equivalence class;
+    # subclasses count the classes whose canonical words are smaller than
+    # an arbitrary word, which ranks and unranks them directly
+
+    def __init__(self, sequence, n):
+
+        self._sequence = self._validate_sequence(sequence)
+        self._a = self._sequence.length()
+
+        if self._a == INF:
+            raise InfiniteSequenceError(self)
+
+        self._n = n
+
+    def _unrank(self, index):
+
+        word = [0] * self._n
+        for pos in range(self._n):
+            low, high = 0, self._a - 1
+            while low < high:
+                mid = (low + high + 1) // 2
+                word[pos] = mid
+                prefix = word[:pos+1] + [0] * (self._n-pos-1)
+                if self._rank(prefix) <= index:
+                    low = mid
+                else:
+                    high = mid - 1
+            word[pos] = low
+        return tuple(word)
+
+    def getitem(self, index):
+
+        return tuple(self._sequence[pos] for pos in self._unrank(index))
+
+    def index(self, val):
+
+        word = _positions(self, self._sequence, val, self._n)
+        if not self._n:
+            return 0
+        if self._canonical(word) != word:
+            raise _not_found(self, val)
+        return self._rank(list(word))
+
+    def canonical(self, val):
+
+        word = _positions(self, self._sequence, val, self._n)
+        return tuple(self._sequence[pos] for pos in self._canonical(word))
+
+class Necklaces(_Words):
+
+    def _canonical(self, word):
+
+        return _min_rotation(word)
+
+    def _rank(self, word):
+
+        # necklaces lexicographically smaller than an arbitrary word
+        return self.length() - _cyclic_count(word, self._a)
+
+    def length(self):
+
+        return _necklace_count(self._a, self._n)
+
+class Bracelets(_Words):
+
+    def _canonical(self, word):
+
+        return min(_min_rotation(word), _min_rotation(word[::-1]))
+
+    def _rank(self, word):
+
+        # bracelets lexicographically smaller than an arbitrary word
+        return self.length() - _dihedral_count(word, self._a)
+
+    def length(self):
+
+        # Burnside over the dihedral group; reflections fix a**((n+1)/2)
+        # words for odd n and (a+1)/2 * a**(n/2) on average for even n
+        a, n = self._a, self._n
+        if n == 0:
+            return 1
+        if n % 2:
+            twice = 2 * a**((n+1) // 2)
+        else:
+            twice = (a+1) * a**(n // 2)
+        return (2 * _necklace_count(a, n) + twice) // 4
+
+class _Checkpointed(Sequence):
+
+    # canonical items are found by filtering an ordered walk over keys;
+    # every _STRIDE-th accepted key is remembered so that lookups only
+    # rescan one stride
+    _STRIDE = 256
+
+    _transient = Sequence._transient + ("_checkpoints", "_exhausted")
+    _checkpoints = None
+    _exhausted = False
+
+    def _scan(self, key):
+
+        while key is not None:
+            if self._accept(key):
+                yield key
+            key = self._next(key)
+
+    def _extend(self, index=None, key=None):
+
+        # checkpoints are only appended, under the lock; readers may use
+        # any prefix of the list they see, so the lock is only taken when
+        # the walk has to move forward
+        cps = self._checkpoints
+        if cps is not None and (self._exhausted or ((index is None or
+                len(cps) > index // self._STRIDE) and (key is None or
+                cps[-1] > key))):
+            return cps
+
+        with self._state_lock():
+            if self._checkpoints is None:
+                first = next(self._scan(self._first()), None)
+                self._checkpoints = [] if first is None else [first]
+                self._exhausted = first is None
+
+            cps = self._checkpoints
+            while not self._exhausted and ((index is not None and len(cps) <= index //
+                    self._STRIDE) or (key is not None and cps[-1] <= key)):
+                for count, found in enumerate(self._scan(cps[-1])):
+                    if count == self._STRIDE:
+                        cps.append(found)
+                        break
+                else:
+                    self._exhausted = True
+                    break
+            return cps
+
+    def _key(self, index):
+
+        cps = self._extend(index=index)
+        offset = index % self._STRIDE
+        for count, key in enumerate(self._scan(cps[index // self._STRIDE])):
+            if count == offset:
+                return key
+
+    def _rank(self, key):
+
+        cps = self._extend(key=key)
+        pos = bisect.bisect_right(cps, key) - 1
+        if pos >= 0:
+            for count, found in enumerate(self._scan(cps[pos])):
+                if found == key:
+                    return pos * self._STRIDE + count
+                elif found > key:
+                    break
+
+class SortedProduct(Sequence):
+
+    _derived = ("_orders", "_values", "_sums")
+
+    def __init__(self, *sequences):
+
+        self._pools = [self._validate_sequence(seq) for seq in sequences]
+        self._pool_lens = [seq.length() for seq in self._pools]
+        self._dimension = len(self._pools)
+
+        if any(_l == INF for _l in self._pool_lens):
+            raise InfiniteSequenceError(self)
+
+        # pools in value order, and prefix sums of the number of
+        # non-decreasing completions for each choice in every dimension
+        self._orders, self._values = [], []
+        for seq, _len in zip(self._pools, self._pool_lens):
+            order = sorted(range(_len), key=lambda pos: seq[pos])
+            self._orders.append(order)
+            self._values.append([seq[pos] for pos in order])
+
+        self._sums = [None] * self._dimension
+        counts = None
+        for dim in range(self._dimension-1, -1, -1):
+            values = self._values[dim]
+            if counts is None:
+                counts = [1] * len(values)
+            else:
+                nexts, sums = self._values[dim+1], self._sums[dim+1]
+                counts = [sums[-1] - sums[bisect.bisect_left(nexts, value)]
+                        for value in values]
+            sums = [0]
+            for count in counts:
+                sums.append(sums[-1] + count)
+            self._sums[dim] = sums
+
+    def _lower(self, dim, prev):
+
+        if dim == 0:
+            return 0
+        return bisect.bisect_left(self._values[dim], prev)
+
+    def getitem(self, index):
+
+        product, prev = [], None
+        for dim in range(self._dimension):
+            sums = self._sums[dim]
+            target = sums[self._lower(dim, prev)] + index
+            pos = bisect.bisect_right(sums, target) - 1
+            index = target - sums[pos]
+            prev = self._values[dim][pos]
+            product.append(self._pools[dim][self._orders[dim][pos]])
+        return tuple(product)
+
+    def index(self, val):
+
+        try:
+            val = tuple(val)
+        except TypeError:
+            raise _not_found(self, val)
+
+        if len(val) != self._dimension:
+            raise _not_found(self, val)
+
+        rank, prev = 0, None
+        for dim, item in enumerate(val):
+            values = self._values[dim]
+            low = self._lower(dim, prev)
+            try:
+                pos = bisect.bisect_left(values, item, low)
+            except TypeError:
+                raise _not_found(self, val)
+            if pos == len(values) or values[pos] != item:
+                raise _not_found(self, val)
+            rank += self._sums[dim][pos] - self._sums[dim][low]
+            prev = item
+        return rank
+
+    def length(self):
+
+        if not self._dimension:
+            return 1
+        return self._sums[0][-1]
+
+class Orbits(_Checkpointed):
+    """One representative, the smallest point, of each orbit of a Product
+    under a group of dimension permutations.
+
+    Unlike Necklaces and Bracelets there is no closed-form rank: points are
+    walked in order with prefix pruning and every representative is
+    checked against the whole group, which is kept in memory. Lookups cost
+    one checkpoint stride of that walk, so Orbits suits small groups and
+    moderate numbers of orbits.
+    """
+
+    def __init__(self, product, generators):
+
+        if not isinstance(product, Product):
+            clsname = product.__class__.__name__
+            raise TypeError("'%s' is not a 'Product'."%clsname)
+
+        self._product = product
+        self._radices = list(reversed(product._pool_lens))
+        self._dimension = len(self._radices)
+
+        # generators permute dimensions: the image of a point p is
+        # (p[g[0]], p[g[1]], ...); dimensions mapped onto each other must
+        # draw from equal pools
+        identity = tuple(range(self._dimension))
+        gens = []
+        for gen in generators:
+            gen = tuple(gen)
+            if sorted(gen) != list(identity):
+                raise ValueError("%s is not a permutation of dimensions."
+                        %str(gen))
+            if any(self._radices[dim] != self._radices[gen[dim]]
+                    for dim in identity):
+                raise ValueError("%s maps dimensions of different lengths."
+                        %str(gen))
+            gens.append(gen)
+
+        group, todo = set([identity]), [identity]
+        while todo:
+            elem = todo.pop()
+            for gen in gens:
+                comp = tuple(elem[gen[dim]] for dim in identity)
+                if comp not in group:
+                    group.add(comp)
+                    todo.append(comp)
+        self._group = sorted(group)
+
+    def _encode(self, coords):
+
+        index = 0
+        for coord, radix in zip(coords, self._radices):
+            index = index * radix + coord
+        return index
+
+    def _canonical(self, key):
+
+        coords = self._product._coords(key)
+        return min(self._encode([coords[dim] for dim in perm])
+                for perm in self._group)
+
+    def _pruned(self, coords, size):
+
+        # true when some group element maps every point starting with
+        # coords[:size] to a smaller point, decided on the prefix alone
+        for perm in self._group:
+            for dim in range(size):
+                src = perm[dim]
+                if src >= size or coords[src] > coords[dim]:
+                    break
+                elif coords[src] < coords[dim]:
+                    return True
+        return False
+
+    def _first(self):
+
+        if self._product.length() > 0:
+            return 0
+
+    def _next(self, key):
+
+        # depth-first over coordinates in lexicographic order; subtrees
+        # below a pruned prefix hold no representative and are skipped
+        coords = self._product._coords(key)
+        pos = self._dimension - 1
+        while pos >= 0:
+            if coords[pos] + 1 < self._radices[pos]:
+                coords[pos] += 1
+                for dim in range(pos+1, self._dimension):
+                    coords[dim] = 0
+                while pos < self._dimension and not self._pruned(coords,
+                        pos+1):
+                    pos += 1
+                if pos == self._dimension:
+                    return self._encode(coords)
+            else:
+                pos -= 1
+
+    def _accept(self, key):
+
+        # _next only reaches representatives
+        return True
+
+    def to_parent(self, index):
+
+        return self._key(index)
+
+    def getitem(self, index):
+
+        return self._product[self._key(index)]
+
+    def index(self, val):
+
+        key = self._product.index(val)
+        rank = None
+        if self._canonical(key) == key:
+            rank = self._rank(key)
+        if rank is None:
+            raise _not_found(self, val)
+        return rank
+
+    def canonical(self, val):
+
+        return self._product[self._canonical(self._product.index(val))]
+
+    def length(self):
+
+        # Burnside: a point is fixed by a permutation when it is constant
+        # on each of its cycles
+        total = 0
+        for perm in self._group:
+            fixed, seen = 1, set()
+            for dim in range(self._dimension):
+                if dim not in seen:
+                    fixed *= self._radices[dim]
+                    while dim not in seen:
+                        seen.add(dim)
+                        dim = perm[dim]
+            total += fixed
+        return total // len(self._group)
@@ -0,0 +1,224 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, print_function,
+        division)
+
+
+from seqgentools.sequence import Sequence
+from seqgentools.algorithms.combinatorics import Product
+
+_GOLDEN = 0.6180339887498949
+
+def _factorize(n):
+
+    factors, p = [], 2
+    while p * p <= n:
+        while n % p == 0:
+            factors.append(p)
+            n //= p
+        p += 1
+    if n > 1:
+        factors.append(n)
+    return factors
+
+class _RadicalInverse(object):
+
+    # digit-reversal permutation of range(radix) over its prime factors;
+    # each digit is also scrambled by a golden-ratio stride so that large
+    # prime factors are not walked in order
+
+    def __init__(self, radix):
+
+        self.factors = _factorize(radix)
+        self.strides = [min(max(int(p * _GOLDEN + 0.5), 1), p-1)
+                for p in self.factors]
+        self.inverses = [pow(g, p-2, p) for g, p in
+                zip(self.strides, self.factors)]
+
+    def compose(self, digits):
+
+        value = 0
+        for digit, p, g in zip(digits, self.factors, self.strides):
+            value = value * p + digit * g % p
+        return value
+
+    def split(self, value):
+
+        digits = []
+        for p, ginv in zip(reversed(self.factors), reversed(self.inverses)):
+            value, digit = divmod(value, p)
+            digits.append(digit * ginv % p)
+        digits.reverse()
+        return digits
+
+    def forward(self, index):
+
+        digits = []
+        for p in self.factors:
+            index, digit = divmod(index, p)
+            digits.append(digit)
+        return self.compose(digits)
+
+    def inverse(self, value):
+
+        index = 0
+        for digit, p in zip(reversed(self.split(value)),
+                reversed(self.factors)):
+            index = index * p + digit
+        return index
+
+class _ProductTraversal(Sequence):
+
+    _derived = ("_radices",)
+
+    def __init__(self, product):
+
+        if not isinstance(product, Product):
+            clsname = product.__class__.__name__
+            raise TypeError("'%s' is not a 'Product'."%clsname)
+
+        self._product = product
+        self._radices = list(reversed(product._pool_lens))
+        self._dimension = len(self._radices)
+
+    def _encode(self, coords):
+
+        index = 0
+        for coord, radix in zip(coords, self._radices):
+            index = index * radix + coord
+        return index
+
+    def _decode(self, index):
+
+        coords = [0] * self._dimension
+        for dim in range(self._dimension-1, -1, -1):
+            index, coords[dim] = divmod(index, self._radices[dim])
+        return coords
+
+    def to_parent(self, index):
+
+        return self._encode(self._coords(index))
+
+    def from_parent(self, index):
+
+        return self._index(self._decode(index))
+
+    def getitem(self, index):
+
+        return self._product[self.to_parent(index)]
+
+    def index(self, val):
+
+        return self.from_parent(self._product.index(val))
+
+    def length(self):
+
+        return self._product.length()
+
+class VanDerCorput(_ProductTraversal):
+
+    _derived = _ProductTraversal._derived + ("_inverses",)
+
+    def __init__(self, product):
+
+        super(VanDerCorput, self).__init__(product)
+        self._inverses = [_RadicalInverse(r) for r in self._radices]
+
+    def _coords(self, index):
+
+        # the first dimension varies fastest, each through its own
+        # radical inverse
+        coords = []
+        for radix, radinv in zip(self._radices, self._inverses):
+            index, digit = divmod(index, radix)
+            coords.append(radinv.forward(digit))
+        return coords
+
+    def _index(self, coords):
+
+        index = 0
+        for dim in range(self._dimension-1, -1, -1):
+            index = (index * self._radices[dim] +
+                    self._inverses[dim].inverse(coords[dim]))
+        return index
+
+class Halton(_ProductTraversal):
+
+    _derived = _ProductTraversal._derived + ("_inverses", "_slots")
+
+    def __init__(self, product):
+
+        super(Halton, self).__init__(product)
+        self._inverses = [_RadicalInverse(r) for r in self._radices]
+
+        # digits of all dimensions interleaved round-robin, the most
+        # significant digit of every coordinate first
+        self._slots = []
+        depth = max([len(r.factors) for r in self._inverses] or [0])
+        for level in range(depth):
+            for dim, radinv in enumerate(self._inverses):
+                if level < len(radinv.factors):
+                    self._slots.append((dim, radinv.factors[level]))
+
+    def _coords(self, index):
+
+        digits = [[] for _ in range(self._dimension)]
+        for dim, p in self._slots:
+            index, digit = divmod(index, p)
+            digits[dim].append(digit)
+        return [radinv.compose(d) for radinv, d in
+                zip(self._inverses, digits)]
+
+    def _index(self, coords):
+
+        digits = [radinv.split(coord) for radinv, coord in
+                zip(self._inverses, coords)]
+        index = 0
+        for dim, p in reversed(self._slots):
+            index = index * p + digits[dim].pop()
+        return index
+
+class LatinHypercube(_ProductTraversal):
+
+    _derived = _ProductTraversal._derived + ("_stratum", "_shifts")
+
+    def __init__(self, product):
+
+        super(LatinHypercube, self).__init__(product)
+
+        # every block of consecutive points walks the largest dimension
+        # once and shifts all the others along with it
+        self._lead = (self._radices.index(max(self._radices))
+                if self._radices else 0)
+        self._block = self._radices[self._lead] if self._radices else 1
+        self._stratum = _RadicalInverse(self._block)
+        self._shifts = [_RadicalInverse(r) for r in self._radices]
+
+    def _coords(self, index):
+
+        block, offset = divmod(index, self._block)
+        base = self._stratum.forward(offset)
+
+        coords = [0] * self._dimension
+        for dim in range(self._dimension-1, -1, -1):
+            if dim == self._lead:
+                coords[dim] = base
+            else:
+                block, digit = divmod(block, self._radices[dim])
+                shift = self._shifts[dim].forward(digit)
+                coords[dim] = (base + shift) % self._radices[dim]
+        return coords
+
+    def _index(self, coords):
+
+        if not self._dimension:
+            return 0
+
+        base = coords[self._lead]
+        block = 0
+        for dim in range(self._dimension):
+            if dim != self._lead:
+                shift = (coords[dim] - base) % self._radices[dim]
+                block = (block * self._radices[dim] +
+                        self._shifts[dim].inverse(shift))
+        return block * self._block + self._stratum.inverse(base)
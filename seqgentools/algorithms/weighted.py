@@ -0,0 +1,205 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, print_function,
+        division)
+
+import sys
+import heapq
+import bisect
+
+from seqgentools.sequence import (Sequence, INF, InfiniteSequenceError,
+        IndexNotFound, _not_found)
+
+_PY3 = sys.version_info >= (3, 0)
+
+if _PY3:
+    from functools import reduce
+
+class WeightedProduct(Sequence):
+
+    # only every _STRIDE-th position keeps a snapshot of the frontier, so
+    # memory grows with the frontier rather than with the points produced;
+    # lookups replay at most one stride from the nearest snapshot
+    _STRIDE = 256
+
+    _transient = Sequence._transient + ("_frontier", "_checkpoints",
+            "_keys", "_exhausted")
+    _frontier = None
+    _checkpoints = None
+    _keys = None
+    _exhausted = False
+
+    # weights are kept as their sorted values and orders
+    _derived = ("_places", "_strides")
+
+    def __init__(self, *sequences, **kwargs):
+
+        weights = kwargs.pop("weights", None)
+
+        self._pools = [self._validate_sequence(seq) for seq in sequences]
+        self._pool_lens = [seq.length() for seq in self._pools]
+        self._dimension = len(self._pools)
+
+        if any(_l == INF for _l in self._pool_lens):
+            raise InfiniteSequenceError(self)
+
+        if weights is None:
+            weights = [None] * self._dimension
+        elif len(weights) != self._dimension:
+            raise ValueError("WeightedProduct needs one weight entry per "
+                "sequence.")
+
+        # each pool is visited from its heaviest element down; ties keep
+        # the pool order
+        self._weights, self._orders, self._places = [], [], []
+        for seq, _len, weight in zip(self._pools, self._pool_lens, weights):
+            if weight is None:
+                values = [0] * _len
+            elif callable(weight):
+                values = [weight(seq[pos]) for pos in range(_len)]
+            else:
+                values = list(weight)
+                if len(values) != _len:
+                    raise ValueError("Weight entry does not match the "
+                        "length of '%s'."%seq.__class__.__name__)
+            order = sorted(range(_len), key=lambda pos: -values[pos])
+            self._orders.append(order)
+            self._places.append(dict((pos, place) for place, pos in
+                    enumerate(order)))
+            self._weights.append([values[pos] for pos in order])
+
+        self._strides = [1] * self._dimension
+        for dim in range(self._dimension-2, -1, -1):
+            self._strides[dim] = (self._strides[dim+1] *
+                    self._pool_lens[dim+1])
+
+    def _score(self, coords):
+
+        return sum(weight[coord] for weight, coord in
+                zip(self._weights, coords))
+
+    def _entry(self, coords):
+
+        # frontier entries sort by descending score, ties by coordinates
+        return -self._score(coords), coords
+
+    def _walk(self, frontier):
+
+        # best-first over the sorted coordinates, popping from frontier in
+        # place; a point only extends its last nonzero dimension or a later
+        # one, so every point has exactly one predecessor and the frontier
+        # never holds duplicates
+        while frontier:
+            entry = heapq.heappop(frontier)
+            coords = entry[1]
+            last = self._dimension - 1
+            while last > 0 and coords[last] == 0:
+                last -= 1
+            for dim in range(last, self._dimension):
+                if coords[dim] + 1 < self._pool_lens[dim]:
+                    succ = coords[:dim] + (coords[dim]+1,) + coords[dim+1:]
+                    heapq.heappush(frontier, self._entry(succ))
+            yield entry
+
+    def _extend(self, index=None, key=None):
+
+        # checkpoints are only appended, under the lock, and always before
+        # their keys; readers may use any prefix of the lists they see
+        cps = self._checkpoints
+        if cps is not None and (self._exhausted or ((index is None or
+                len(cps) > index // self._STRIDE) and (key is None or
+                (self._keys and self._keys[-1] > key)))):
+            return cps
+
+        with self._state_lock():
+            if self._checkpoints is None:
+                self._frontier = []
+                if self.length() > 0:
+                    origin = (0,) * self._dimension
+                    self._frontier.append(self._entry(origin))
+                self._checkpoints, self._keys = [], []
+
+            cps, frontier = self._checkpoints, self._frontier
+            while not self._exhausted and ((index is not None and
+                    len(cps) <= index // self._STRIDE) or (key is not None
+                    and (not self._keys or self._keys[-1] <= key))):
+                if not frontier:
+                    self._exhausted = True
+                    break
+                cps.append(list(frontier))
+                self._keys.append(frontier[0])
+                walk = self._walk(frontier)
+                for _ in range(self._STRIDE):
+                    if next(walk, None) is None:
+                        break
+            return cps
+
+    def _coords(self, index):
+
+        cps = self._extend(index=index)
+        walk = self._walk(list(cps[index // self._STRIDE]))
+        for _ in range(index % self._STRIDE):
+            next(walk)
+        return next(walk)[1]
+
+    def _point(self, coords):
+
+        return tuple(seq[order[coord]] for seq, order, coord in
+                zip(self._pools, self._orders, coords))
+
+    def getitem(self, index):
+
+        return self._point(self._coords(index))
+
+    def score(self, index):
+
+        return self._score(self._coords(index))
+
+    def topk(self, k):
+
+        cps = self._extend(index=0)
+        points = []
+        if cps:
+            for entry in self._walk(list(cps[0])):
+                if len(points) == k:
+                    break
+                points.append(self._point(entry[1]))
+        return points
+
+    def to_parent(self, index):
+
+        # index of the same point in the lexicographic Product of the pools
+        return sum(order[coord] * stride for order, coord, stride in
+                zip(self._orders, self._coords(index), self._strides))
+
+    def index(self, val):
+
+        try:
+            val = tuple(val)
+        except TypeError:
+            val = None
+
+        if val is None or len(val) != self._dimension:
+            raise _not_found(self, val)
+
+        try:
+            coords = tuple(places[seq.index(item)] for item, seq, places in
+                    zip(val, self._pools, self._places))
+        except (IndexNotFound, NotImplementedError, KeyError):
+            raise _not_found(self, val)
+
+        # points are produced in ascending order of their entries, so the
+        # value is replayed from the last checkpoint at or before it
+        key = self._entry(coords)
+        cps = self._extend(key=key)
+        pos = bisect.bisect_right(self._keys, key) - 1
+        for count, entry in enumerate(self._walk(list(cps[pos]))):
+            if entry == key:
+                return pos * self._STRIDE + count
+            elif entry > key:
+                break
+        raise _not_found(self, val)
+
+    def length(self):
+
+        return reduce(lambda x, y: x*y, self._pool_lens, 1)
@@ -0,0 +1,384 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, print_function,
+        division)
+
+import sys
+import bisect
+
+from seqgentools.sequence import (Sequence, Slice, Cycle, Repeat, Chain,
+        INF, IndexNotFound)
+from seqgentools.algorithms.combinatorics import (Product, Permutations,
+        Combinations, Combinations_with_replacement, PermutationRange,
+        CombinationRange, nPr, nCr)
+
+_PY3 = sys.version_info >= (3, 0)
+
+if _PY3:
+    long = int
+
+class RankError(IndexNotFound):
+
+    # path holds the child positions from the root of the plan down to the
+    # sub-sequence that rejected the value
+
+    def __init__(self, val, sequence, path):
+
+        self.value = val
+        self.sequence = sequence
+        self.path = path
+        where = "root" + "".join("[%d]"%pos for pos in path)
+        super(RankError, self).__init__("%s is not in '%s' at %s."%(
+            str(val), sequence.__class__.__name__, where))
+
+def _choose(n, k):
+
+    return nCr(n, k) if 0 <= k <= n else 0
+
+def _multichoose(n, k):
+
+    if k == 0:
+        return 1
+    return nCr(n+k-1, k) if n > 0 else 0
+
+def _tuple(val, size, seq, path):
+
+    try:
+        val = tuple(val)
+    except TypeError:
+        raise RankError(val, seq, path)
+    if len(val) != size:
+        raise RankError(val, seq, path)
+    return val
+
+def _occurrence(unrank, n, item, start, used=()):
+
+    # pools with repeated elements: the next usable position of item
+    for pos in range(start, n):
+        if pos not in used and unrank(pos) == item:
+            return pos
+
+def _product(seq, path, steps):
+
+    pools = list(reversed(seq._pools))
+    plans = [_compile(pool, path + (dim,), steps)
+            for dim, pool in enumerate(pools)]
+    unranks = [plan[0] for plan in plans]
+    ranks = [plan[1] for plan in plans]
+    radices = [plan[2] for plan in plans]
+    dims = range(len(pools)-1, -1, -1)
+    size = len(pools)
+
+    def unrank(index):
+        out = [None] * size
+        for dim in dims:
+            index, digit = divmod(index, radices[dim])
+            out[dim] = unranks[dim](digit)
+        return tuple(out)
+
+    def rank(val):
+        val = _tuple(val, size, seq, path)
+        index = 0
+        for item, radix, _rank in zip(val, radices, ranks):
+            index = index * radix + _rank(item)
+        return index
+
+    return "mixed-radix", unrank, rank
+
+def _permutations(seq, path, steps):
+
+    unrank_pos, rank_pos, n = _compile(seq._sequence, path + (0,), steps)
+    r = seq._r
+    weights = [nPr(n-1-k, r-1-k) for k in range(r)] if r <= n else []
+
+    def unrank(index):
+        avail, out = list(range(n)), []
+        for weight in weights:
+            digit, index = divmod(index, weight)
+            out.append(unrank_pos(avail.pop(digit)))
+        return tuple(out)
+
+    def rank(val):
+        positions, used = [], set()
+        for item in _tuple(val, r, seq, path):
+            pos = rank_pos(item)
+            if pos in used:
+                pos = _occurrence(unrank_pos, n, item, pos+1, used)
+                if pos is None:
+                    raise RankError(val, seq, path)
+            used.add(pos)
+            positions.append(pos)
+        index = 0
+        for k, (pos, weight) in enumerate(zip(positions, weights)):
+            index += weight * (pos - sum(1 for p in positions[:k] if p < pos))
+        return index
+
+    return "factoradic", unrank, rank
+
+def _combinations(seq, path, steps):
+
+    unrank_pos, rank_pos, n = _compile(seq._sequence, path + (0,), steps)
+    r = seq._r
+
+    def unrank(index):
+        out, pos = [], 0
+        for k in range(r):
+            while True:
+                count = _choose(n-1-pos, r-1-k)
+                if index < count:
+                    break
+                index -= count
+                pos += 1
+            out.append(unrank_pos(pos))
+            pos += 1
+        return tuple(out)
+
+    def rank(val):
+        index, low = 0, 0
+        for k, item in enumerate(_tuple(val, r, seq, path)):
+            pos = rank_pos(item)
+            if pos < low:
+                pos = _occurrence(unrank_pos, n, item, low)
+                if pos is None:
+                    raise RankError(val, seq, path)
+            # combinations that place a smaller position at slot k
+            index += _choose(n-low, r-k) - _choose(n-pos, r-k)
+            low = pos + 1
+        return index
+
+    return "combinadic", unrank, rank
+
+def _combinations_with_replacement(seq, path, steps):
+
+    unrank_pos, rank_pos, n = _compile(seq._sequence, path + (0,), steps)
+    r = seq._r
+
+    def unrank(index):
+        out, pos = [], 0
+        for k in range(r):
+            while True:
+                count = _multichoose(n-pos, r-1-k)
+                if index < count:
+                    break
+                index -= count
+                pos += 1
+            out.append(unrank_pos(pos))
+        return tuple(out)
+
+    def rank(val):
+        index, low = 0, 0
+        for k, item in enumerate(_tuple(val, r, seq, path)):
+            pos = rank_pos(item)
+            if pos < low:
+                pos = _occurrence(unrank_pos, n, item, low)
+                if pos is None:
+                    raise RankError(val, seq, path)
+            for skipped in range(low, pos):
+                index += _multichoose(n-skipped, r-1-k)
+            low = pos
+        return index
+
+    return "combinadic", unrank, rank
+
+def _segments(seq, sequences, path, steps):
+
+    plans = [_compile(sub, path + (pos,), steps)
+            for pos, sub in enumerate(sequences)]
+    offsets = [0]
+    for plan in plans[:-1]:
+        offsets.append(offsets[-1] + plan[2])
+
+    def unrank(index):
+        pos = bisect.bisect_right(offsets, index) - 1
+        return plans[pos][0](index - offsets[pos])
+
+    def rank(val):
+        # the first segment that holds the value decides
+        for offset, plan in zip(offsets, plans):
+            try:
+                return offset + plan[1](val)
+            except RankError:
+                pass
+        raise RankError(val, seq, path)
+
+    return "chain offsets", unrank, rank
+
+def _chain(seq, path, steps):
+
+    return _segments(seq, seq._sequences, path, steps)
+
+def _slice(seq, path, steps):
+
+    parent_unrank, parent_rank, _ = _compile(seq._sequence, path + (0,),
+            steps)
+    start, step, _len = seq._start, seq._step, seq.length()
+
+    def unrank(index):
+        return parent_unrank(start + step * index)
+
+    # a cycle repeats its first occurrence every period items, and
+    # |step| repetitions cover every residue of the step
+    period = seq._sequence._sequence_len if isinstance(seq._sequence,
+            Cycle) else 0
+
+    def rank(val):
+        pos = parent_rank(val)
+        if period:
+            # the repetition nearest to start in the slice direction
+            pos += period * max(0, -((pos - start) // period) if step > 0
+                    else (start - pos) // period)
+            candidates = [pos + period * turn * (1 if step > 0 else -1)
+                    for turn in range(abs(step))]
+        else:
+            candidates = [pos]
+        found = None
+        for pos in candidates:
+            index, rem = divmod(pos - start, step)
+            if not rem and 0 <= index < _len:
+                found = index
+                break
+        if found is not None and step > 0:
+            return found
+        # the parent may repeat the value: before the window, off the step
+        # or, walking backwards, after an earlier slice position
+        limit = _len if found is None else found
+        if limit != INF:
+            for index in range(limit):
+                if unrank(index) == val:
+                    return index
+        if found is None:
+            raise RankError(val, seq, path)
+        return found
+
+    return "slice affine", unrank, rank
+
+def _cycle(seq, path, steps):
+
+    child_unrank, child_rank, n = _compile(seq._sequence, path + (0,),
+            steps)
+
+    def unrank(index):
+        return child_unrank(index % n)
+
+    return "cycle", unrank, child_rank
+
+def _repeat(seq, path, steps):
+
+    elem = seq._elem
+
+    def unrank(index):
+        return elem
+
+    def rank(val):
+        if val != elem:
+            raise RankError(val, seq, path)
+        return 0
+
+    return "repeat", unrank, rank
+
+def _leaf(seq, path, steps):
+
+    getitem = seq.getitem
+    index = seq.index
+
+    def rank(val):
+        try:
+            return index(val)
+        except (IndexNotFound, NotImplementedError, TypeError):
+            raise RankError(val, seq, path)
+
+    return "leaf lookup", getitem, rank
+
+def _range(seq, path, steps):
+
+    # the sub-sequences per r are the segments of the inner chain
+    return _segments(seq, seq._chain._sequences, path, steps)
+
+_RULES = (
+    (Product, _product),
+    (Permutations, _permutations),
+    (Combinations, _combinations),
+    (Combinations_with_replacement, _combinations_with_replacement),
+    (PermutationRange, _range),
+    (CombinationRange, _range),
+    (Chain, _chain),
+    (Slice, _slice),
+    (Cycle, _cycle),
+    (Repeat, _repeat),
+)
+
+def _compile(seq, path, steps):
+
+    for cls, rule in _RULES:
+        if isinstance(seq, cls):
+            break
+    else:
+        rule = _leaf
+
+    # the step is recorded before the children so that steps list the
+    # tree in pre-order
+    pos = len(steps)
+    steps.append(None)
+    kind, unrank, rank = rule(seq, path, steps)
+    steps[pos] = (path, kind, seq.__class__.__name__)
+    return unrank, rank, seq.length()
+
+class RankPlan(object):
+
+    def __init__(self, sequence):
+
+        if not isinstance(sequence, Sequence):
+            clsname = sequence.__class__.__name__
+            raise TypeError("'%s' is not a sequence generator."%clsname)
+
+        self._sequence = sequence
+        self._steps = []
+        self._unrank, self._rank, self._length = _compile(sequence, (),
+                self._steps)
+
+    def length(self):
+
+        return self._length
+
+    def __len__(self):
+
+        return self._length
+
+    def steps(self):
+
+        return list(self._steps)
+
+    def describe(self):
+
+        return "\n".join("%s%s: %s"%("  " * len(path), clsname, kind)
+                for path, kind, clsname in self._steps)
+
+    def _validate_index(self, index):
+
+        if not isinstance(index, (int, long)):
+            raise TypeError("Index should be 'int' or "
+                "'long' type: %s"%type(index))
+        if index < 0 and self._length != INF:
+            index += self._length
+        if index < 0 or index >= self._length:
+            raise IndexError("Index is out of range at '%s'"%
+                self._sequence.__class__.__name__)
+        return index
+
+    def unrank(self, index):
+
+        return self._unrank(self._validate_index(index))
+
+    def rank(self, val):
+
+        return self._rank(val)
+
+    def unrank_many(self, indices):
+
+        unrank, validate = self._unrank, self._validate_index
+        return [unrank(validate(index)) for index in indices]
+
+    def rank_many(self, values):
+
+        rank = self._rank
+        return [rank(val) for val in values]
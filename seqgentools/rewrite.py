@@ -0,0 +1,177 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, print_function,
+        division)
+
+from seqgentools.sequence import (Sequence, Slice, Range, Count, Cycle,
+        Repeat, Chain, INF)
+
+def _slice(start, step, _len):
+
+    # normalized bounds of a slice with a known length
+    if _len == INF:
+        return slice(start, None, step)
+    stop = start + step * _len
+    if step < 0 and stop < 0:
+        stop = None
+    return slice(start, stop, step)
+
+def _rewrite_slice(seq):
+
+    parent = optimize(seq._sequence)
+    start, step, _len = seq._start, seq._step, seq.length()
+
+    if start == 0 and step == 1 and _len == parent.length():
+        return parent
+
+    # bounds of an empty slice are meaningless, keep it trivially empty
+    if _len == 0:
+        if parent is seq._sequence:
+            return seq
+        return Slice(parent, slice(0, 0))
+
+    if isinstance(parent, Slice):
+        start = parent._start + parent._step * start
+        step = parent._step * step
+        return Slice(parent._sequence, _slice(start, step, _len))
+
+    if type(parent) is Range:
+        start = parent._start + parent._step * start
+        step = parent._step * step
+        return Range(start, start + step * _len, step)
+
+    if type(parent) is Count:
+        start = parent._start + parent._step * start
+        step = parent._step * step
+        if step == 0:
+            return Repeat(start, None if _len == INF else _len)
+        elif _len == INF:
+            return Count(start, step)
+        return Range(start, start + step * _len, step)
+
+    if type(parent) is Repeat:
+        return Repeat(parent._elem, None if _len == INF else _len)
+
+    if type(parent) is _product():
+        pools = list(reversed(parent._pools))
+        if len(pools) == 1:
+            return _product()(optimize(Slice(pools[0],
+                _slice(start, step, _len))))
+        stride = parent.length() // max(parent._pool_lens[-1], 1)
+        if (step == 1 and stride > 0 and start % stride == 0 and
+                _len % stride == 0):
+            lead = Slice(pools[0], slice(start // stride,
+                (start + _len) // stride))
+            return _product()(optimize(lead), *pools[1:])
+
+    if parent is not seq._sequence:
+        return Slice(parent, _slice(start, step, _len))
+
+    return seq
+
+def _rewrite_chain(seq):
+
+    children = []
+    for child in seq._sequences:
+        child = optimize(child)
+        if type(child) is Chain:
+            subs = child._sequences
+        else:
+            subs = [child]
+        for sub in subs:
+            if children and _mergeable(children[-1], sub):
+                children[-1] = _merge(children[-1], sub)
+            else:
+                children.append(sub)
+
+    if len(children) == 1:
+        return children[0]
+    elif len(children) == len(seq._sequences) and all(a is b for a, b in
+            zip(children, seq._sequences)):
+        return seq
+    return Chain(*children)
+
+def _mergeable(first, second):
+
+    if type(first) is Repeat and type(second) is Repeat:
+        return first._elem is second._elem and first._times != INF
+    elif type(first) is Range and type(second) is Range:
+        return (first._step == second._step and
+                first.length() != INF and second.length() != INF and
+                first._start + first._step * first.length() == second._start)
+    return False
+
+def _merge(first, second):
+
+    if type(first) is Repeat:
+        times = second._times
+        return Repeat(first._elem, None if times == INF else
+                first._times + times)
+    return Range(first._start, second._start + second._step *
+            second.length(), first._step)
+
+def _rewrite_cycle(seq):
+
+    child = optimize(seq._sequence)
+
+    # a cycle of an empty sequence yields None, unlike an endless Repeat
+    if type(child) is Repeat and child._times:
+        return Repeat(child._elem)
+    elif child.length() == 1:
+        return Repeat(child[0])
+    elif child is not seq._sequence:
+        return Cycle(child)
+    return seq
+
+def _rewrite_children(seq):
+
+    changed = {}
+    for name in seq._children:
+        value = seq.__dict__.get(name)
+        if isinstance(value, Sequence):
+            child = optimize(value)
+            if child is not value:
+                changed[name] = child
+        elif isinstance(value, (list, tuple)) and value and all(
+                isinstance(v, Sequence) for v in value):
+            children = [optimize(v) for v in value]
+            if any(a is not b for a, b in zip(children, value)):
+                changed[name] = type(value)(children)
+
+    if not changed:
+        return seq
+
+    obj = seq.copy()
+    obj.__dict__.update(changed)
+    return obj
+
+def _product():
+
+    from seqgentools.algorithms.combinatorics import Product
+    return Product
+
+_RULES = {
+    Slice: _rewrite_slice,
+    Chain: _rewrite_chain,
+    Cycle: _rewrite_cycle,
+}
+
+def optimize(seq):
+
+    if not isinstance(seq, Sequence):
+        return seq
+
+    if seq._rewritten is not None:
+        return seq._rewritten
+
+    rule = _RULES.get(type(seq))
+    if rule is None and isinstance(seq, Slice):
+        rule = _rewrite_slice
+    result = (rule or _rewrite_children)(seq)
+
+    # the result is a fixed point; later lookups go straight to it
+    result._rewritten = result
+    if result is not seq:
+        seq._rewritten = result
+
+    return result
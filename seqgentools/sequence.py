@@ -5,25 +5,60 @@ from __future__ import (unicode_literals, print_function,
 
 import sys
 import abc
-import copy
-import math
+import threading
 
 _PY3 = sys.version_info >= (3, 0)
 
-# TODO: support cache for all Sequences
 # TODO: support pop method
 
 if _PY3:
-    Object = abc.ABCMeta("Object", (object,), {})
     from functools import reduce
     long = int
-else:
-    Object = abc.ABCMeta("Object".encode("utf-8"),
-            (object,), {})
+
+__all__ = ["INF", "NAN", "InfiniteSequenceError", "IndexNotFound",
+    "ThreadLocalCache", "SequenceIterator", "Sequence", "Wrapper", "Slice",
+    "Islice", "Windowed", "Batched", "Range", "Count", "Cycle", "Repeat",
+    "Chain"]
 
 INF = float("inf")
 NAN = float("nan")
 
+def _span(start, stop, step):
+
+    if stop == INF:
+        return INF
+    elif step > 0:
+        _len = (stop - start + step - 1) // step
+    else:
+        _len = (stop - start + step + 1) // step
+    return max(_len, 0)
+
+# guards the lazy creation of per-sequence locks
+_LOCK = threading.Lock()
+
+_MISSING = object()
+
+class _SequenceMeta(abc.ABCMeta):
+
+    # every sequence generator accepts the lookup cache options, whatever
+    # its own constructor arguments are
+    def __call__(cls, *vargs, **kwargs):
+
+        cache = kwargs.pop("cache", None)
+        cache_limit = kwargs.pop("cache_limit", _MISSING)
+        obj = super(_SequenceMeta, cls).__call__(*vargs, **kwargs)
+        if cache is not None:
+            obj._cache = cache
+        if cache_limit is not _MISSING:
+            obj._cache_limit = cache_limit
+        return obj
+
+if _PY3:
+    Object = _SequenceMeta("Object", (object,), {})
+else:
+    Object = _SequenceMeta("Object".encode("utf-8"),
+            (object,), {})
+
 class InfiniteSequenceError(Exception):
 
     def __init__(self, obj):
@@ -34,15 +69,117 @@ class InfiniteSequenceError(Exception):
 class IndexNotFound(Exception):
     pass
 
+def _not_found(obj, val):
+
+    return IndexNotFound("%s is not in '%s'."%(str(val),
+        obj.__class__.__name__))
+
+def _positions(obj, sequence, val, n=None, distinct=False):
+
+    # pool positions of the items of val, optionally checking its length;
+    # with distinct, repeated items consume their occurrences in order
+    try:
+        val = tuple(val)
+        pos = [sequence.index(elem) for elem in val]
+    except (IndexNotFound, NotImplementedError, TypeError):
+        raise _not_found(obj, val)
+    if n is not None and len(pos) != n:
+        raise _not_found(obj, val)
+    if distinct:
+        used = set()
+        for idx, elem in enumerate(val):
+            while pos[idx] in used:
+                for nxt in range(pos[idx]+1, sequence.length()):
+                    if nxt not in used and sequence[nxt] == elem:
+                        pos[idx] = nxt
+                        break
+                else:
+                    raise _not_found(obj, val)
+            used.add(pos[idx])
+    return tuple(pos)
+
+
+class ThreadLocalCache(object):
+
+    # a lookup cache sharded per thread: threads never see each other's
+    # entries and never contend on the same dict
+
+    def __init__(self):
+
+        self._local = threading.local()
+
+    def _shard(self):
+
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+        return shard
+
+    def get(self, key, default=None):
+        return self._shard().get(key, default)
+
+    def __getitem__(self, key):
+        return self._shard()[key]
+
+    def __setitem__(self, key, value):
+        self._shard()[key] = value
+
+    def __contains__(self, key):
+        return key in self._shard()
+
+    def __len__(self):
+        return len(self._shard())
+
+class SequenceIterator(object):
+
+    # each iteration keeps its own position, so a sequence can be iterated
+    # from several threads or nested loops at once
+
+    def __init__(self, sequence):
+
+        self._sequence = sequence
+        self._length = sequence.length()
+        self._index = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+
+        if self._length == INF or self._index < self._length:
+            val = self._sequence._lookup(self._index)
+            self._index += 1
+            return val
+        else:
+            raise StopIteration
+
+    def next(self):
+        return self.__next__()
 
 class Sequence(Object):
 
+    # per-instance state that is not part of what a sequence generates
+    _transient = ("_iterator", "_cache", "_cache_limit", "_rewritten",
+            "_lock")
+
+    # tables computed from the constructor arguments; they are left out of
+    # the spec that identifies what a sequence generates
+    _derived = ()
+
+    # attributes that may hold child sequences, rewritten by optimize()
+    _children = ("_sequence", "_sequences", "_pools", "_product", "_chain")
+
+    # equivalent, cheaper expression tree used for lookups
+    _rewritten = None
+
+    # the iterator that next(sequence) advances, created on first use
+    _iterator = None
+
     def __new__(cls, *vargs, **kwargs):
 
         obj = super(Sequence, cls).__new__(cls)
-        obj._iter_index = 0
-        obj._cache = kwargs.pop("cache", {})
-        obj._cache_limit = kwargs.pop("cache_limit", 1024)
+        obj._cache = {}
+        obj._cache_limit = 1024
 
         return obj
 
@@ -54,9 +191,41 @@ class Sequence(Object):
     def length(self):
         pass
 
-    @abc.abstractmethod
-    def copy(self, memo={}):
-        pass
+    def copy(self, memo=None):
+
+        # sequences are immutable, so children and pools are shared and
+        # only the state listed in _transient starts afresh
+        obj = self.__class__.__new__(self.__class__)
+        for name, value in vars(self).items():
+            if name not in self._transient:
+                obj.__dict__[name] = value
+        obj._cache_limit = self._cache_limit
+        if isinstance(self._cache, ThreadLocalCache):
+            obj._cache = ThreadLocalCache()
+
+        return obj
+
+    def __getstate__(self):
+
+        state = dict((name, value) for name, value in vars(self).items()
+                if name not in self._transient)
+        state["_cache_limit"] = self._cache_limit
+        return state
+
+    def __setstate__(self, state):
+
+        # protocols 0 and 1 restore without calling __new__
+        self._cache = {}
+        self.__dict__.update(state)
+
+    def _state_lock(self):
+
+        # lock for sequences that build enumeration state lazily
+        lock = self.__dict__.get("_lock")
+        if lock is None:
+            with _LOCK:
+                lock = self.__dict__.setdefault("_lock", threading.RLock())
+        return lock
 
     def __len__(self):
         return self.length()
@@ -78,18 +247,27 @@ class Sequence(Object):
             index = self._validate_index(index)
             
             if index < self.length():
-                if index in self._cache:
-                    return self._cache[index]
-                else:
-                    value = self.getitem(index)
-                    if self._cache_limit and len(self._cache) < self._cache_limit:
-                        self._cache[index] = value
-                    return value
+                # single dict operations only, safe to share across threads
+                cache = self._cache
+                value = cache.get(index, _MISSING)
+                if value is _MISSING:
+                    value = self._lookup(index)
+                    if self._cache_limit and len(cache) < self._cache_limit:
+                        cache[index] = value
+                return value
             else:
                 clsname = self.__class__.__name__
                 raise IndexError(
                         "Index is out of range at '%s'"%clsname)
 
+    def _lookup(self, index):
+
+        target = self._rewritten
+        if target is None:
+            from seqgentools.rewrite import optimize
+            target = self._rewritten = optimize(self)
+        return target.getitem(index)
+
     def index(self, val):
         clsname = self.__class__.__name__
         raise NotImplementedError(
@@ -108,21 +286,23 @@ class Sequence(Object):
 
     def __iter__(self):
 
-        self._iter_index = 0
-        return self
+        return SequenceIterator(self)
 
     def __next__(self):
 
-        if self.length() == INF or self._iter_index < self.length():
-            val = self.getitem(self._iter_index)
-            self._iter_index += 1
-            return val
-        else:
-            raise StopIteration
+        # kept for next(sequence), which advances one iterator held by the
+        # sequence; use iter() for independent or concurrent iteration
+        if self._iterator is None:
+            self._iterator = SequenceIterator(self)
+        return next(self._iterator)
 
     def next(self):
         return self.__next__()
 
+    def __aiter__(self):
+        from seqgentools.aio import aiter
+        return aiter(self)
+
     def get(self, index, *vargs):
         val = self.__getitem__(index)
         if val is not None:
@@ -184,6 +364,12 @@ class Sequence(Object):
 
 class Wrapper(Sequence):
 
+    _transient = Sequence._transient + ("_positions",)
+    _positions = None
+
+    # the wrapped items are user data, even when they are sequences
+    _children = ()
+
     def __init__(self, iterable):
 
         self._sequence = tuple(iterable)
@@ -191,9 +377,28 @@ class Wrapper(Sequence):
     def getitem(self, index):
 
         return self._sequence[index]
-        
-    def copy(self, memo={}):
-        return Wrapper(copy.deepcopy(self._sequence, memo))
+
+    def index(self, val):
+
+        if self._positions is None:
+            positions = {}
+            try:
+                for idx, elem in enumerate(self._sequence):
+                    positions.setdefault(elem, idx)
+            except TypeError:
+                positions = False
+            self._positions = positions
+
+        try:
+            if self._positions is not False:
+                return self._positions[val]
+            return self._sequence.index(val)
+        except (KeyError, ValueError):
+            raise _not_found(self, val)
+        except TypeError:
+            if val in self._sequence:
+                return self._sequence.index(val)
+            raise _not_found(self, val)
 
     def length(self):
         return len(self._sequence)
@@ -203,11 +408,26 @@ class Slice(Sequence):
     def __init__(self, sequence, slc):
 
         self._sequence = self._validate_sequence(sequence)
+        self._slice = slc
+
+        _len = self._sequence.length()
 
-        self._start = 0 if slc.start is None else slc.start
-        self._stop = (self._sequence.length() if slc.stop is
-                None else slc.stop)
-        self._step = 1 if slc.step is None else slc.step
+        if _len == INF:
+            self._step = 1 if slc.step is None else slc.step
+            if self._step == 0:
+                raise ValueError("slice step cannot be zero")
+            self._start = 0 if slc.start is None else slc.start
+            if slc.stop is None:
+                self._stop = INF if self._step > 0 else -1
+            else:
+                self._stop = slc.stop
+            if self._start < 0 or self._stop < -1 or (self._stop == -1
+                    and slc.stop is not None) or (self._step < 0 and
+                    slc.start is None):
+                raise TypeError("Infinite sequence does not support "
+                    "negative index: %s"%str(slc))
+        else:
+            self._start, self._stop, self._step = slc.indices(_len)
 
     def getitem(self, index):
 
@@ -215,17 +435,76 @@ class Slice(Sequence):
         if ((self._step > 0 and val < self._stop) or
                 (self._step < 0 and val > self._stop)):
             return self._sequence[val]
-        
-    def copy(self, memo={}):
-        slc = slice(self._start, self._stop, self._step)
-        return Slice(copy.deepcopy(self._sequence, memo), slc)
+
+    def getitems(self):
+
+        return tuple(self._sequence[self._start + self._step * index]
+                for index in range(self.length()))
+
+    def length(self):
+        return _span(self._start, self._stop, self._step)
+
+class Islice(Slice):
+
+    def __init__(self, sequence, *vargs):
+
+        slc = slice(*vargs)
+        if any(v is not None and (not isinstance(v, (int, long)) or v < 0)
+                for v in (slc.start, slc.stop)):
+            raise ValueError("Indices for Islice() must be None or "
+                "non-negative integers.")
+        if slc.step is not None and (not isinstance(slc.step, (int, long))
+                or slc.step < 1):
+            raise ValueError("Step for Islice() must be a positive "
+                "integer or None.")
+
+        super(Islice, self).__init__(sequence, slc)
+
+class Windowed(Sequence):
+
+    def __init__(self, sequence, n, step=1):
+
+        self._sequence = self._validate_sequence(sequence)
+
+        if not isinstance(n, (int, long)) or n < 1:
+            raise ValueError("Window size must be a positive integer.")
+        if not isinstance(step, (int, long)) or step < 1:
+            raise ValueError("Window step must be a positive integer.")
+
+        self._n, self._step = n, step
+
+    def getitem(self, index):
+
+        start = index * self._step
+        return Slice(self._sequence, slice(start, start + self._n))
+
+    def getitems(self, index):
+
+        return self.__getitem__(index).getitems()
+
+    def length(self):
+
+        _len = self._sequence.length()
+        if _len == INF:
+            return INF
+        elif _len < self._n:
+            return 0
+        else:
+            return (_len - self._n) // self._step + 1
+
+class Batched(Windowed):
+
+    def __init__(self, sequence, n):
+
+        super(Batched, self).__init__(sequence, n, step=n)
 
     def length(self):
-        _len = float(self._stop - self._start) / float(self._step)
+
+        _len = self._sequence.length()
         if _len == INF:
             return INF
         else:
-            return int(math.ceil(_len)) if _len > 0 else 0
+            return (_len + self._n - 1) // self._n
 
 class Range(Sequence):
 
@@ -260,15 +539,17 @@ class Range(Sequence):
                 (self._step < 0 and val > self._stop)):
             return val
 
-    def copy(self, memo={}):
-        return Range(self._start, self._stop, self._step)
+    def index(self, val):
+
+        if isinstance(val, (int, long)):
+            idx, rem = divmod(val - self._start, self._step)
+            if rem == 0 and 0 <= idx < self.length():
+                return idx
+
+        raise _not_found(self, val)
 
     def length(self):
-        _len = float(self._stop - self._start) / float(self._step)
-        if _len == INF:
-            return INF
-        else:
-            return int(math.ceil(_len)) if _len > 0 else 0
+        return _span(self._start, self._stop, self._step)
 
 class Count(Sequence):
 
@@ -283,8 +564,18 @@ class Count(Sequence):
 
         return self._start + self._step * index
 
-    def copy(self, memo={}):
-        return Count(self._start, self._step)
+    def index(self, val):
+
+        if isinstance(val, (int, long)):
+            if self._step == 0:
+                if val == self._start:
+                    return 0
+            else:
+                idx, rem = divmod(val - self._start, self._step)
+                if rem == 0 and idx >= 0:
+                    return idx
+
+        raise _not_found(self, val)
 
     def length(self):
         return INF
@@ -315,10 +606,6 @@ class Cycle(Sequence):
 
             return self._sequence[index]
 
-    def copy(self, memo={}):
-
-        return Cycle(copy.deepcopy(self._sequence, memo))
-
     def length(self):
 
         return INF
@@ -341,9 +628,6 @@ class Repeat(Sequence):
 
         return self._elem
 
-    def copy(self, memo={}):
-        return Repeat(self._elem, times=self._times)
-
     def length(self):
 
         return self._times
@@ -371,11 +655,6 @@ class Chain(Sequence):
                 return seq[index - accum_len]
             accum_len += _len
 
-    def copy(self, memo={}):
-
-        seqs = [copy.deepcopy(s, memo) for s in self._sequences]
-        return Chain(*seqs)
-
     def length(self):
 
         if len(self._sequence_lens) > 0:
@@ -0,0 +1,220 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, print_function,
+        division)
+
+import sys
+import hashlib
+import sqlite3
+import threading
+
+from seqgentools.sequence import Sequence, INF
+
+_PY3 = sys.version_info >= (3, 0)
+
+if _PY3:
+    import pickle
+    long = int
+    unicode = str
+else:
+    import cPickle as pickle
+
+_BATCH = 500
+
+_range = type(range(0))
+_function = type(lambda: None)
+_code = type((lambda: None).__code__)
+
+_SCHEMA = """CREATE TABLE IF NOT EXISTS results (
+    spec TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    value BLOB,
+    PRIMARY KEY (spec, idx))"""
+
+def _spec(obj):
+
+    # constructor inputs and child sequences only; derived tables would make
+    # the spec large without telling sequences apart
+    if isinstance(obj, Sequence):
+        state = sorted((name, value) for name, value in vars(obj).items()
+                if name not in obj._transient and name not in obj._derived)
+        return "%s.%s(%s)"%(obj.__class__.__module__,
+                obj.__class__.__name__, ",".join("%s=%s"%(name,
+                _spec(value)) for name, value in state))
+    elif isinstance(obj, (list, tuple)):
+        items = ",".join(_spec(item) for item in obj)
+        return "[%s]"%items if isinstance(obj, list) else "(%s)"%items
+    elif isinstance(obj, dict):
+        return "{%s}"%",".join(sorted("%s:%s"%(_spec(k), _spec(v))
+                for k, v in obj.items()))
+    elif isinstance(obj, (set, frozenset)):
+        return "set(%s)"%",".join(sorted(_spec(item) for item in obj))
+    elif obj is None or isinstance(obj, (bool, int, long, float, unicode,
+            bytes, _range, slice)):
+        return repr(obj)
+    elif isinstance(obj, _function):
+        # lambdas share a name, so the compiled body is part of the spec,
+        # and so are the values it closes over or takes by default
+        try:
+            cells = tuple(cell.cell_contents for cell in
+                    obj.__closure__ or ())
+        except ValueError:
+            raise ValueError("No stable spec for %r; pass an explicit "
+                    "key."%obj)
+        return "%s.%s%s%s"%(obj.__module__, getattr(obj, "__qualname__",
+                obj.__name__), _spec(obj.__code__), _spec((cells,
+                obj.__defaults__, getattr(obj, "__kwdefaults__", None))))
+    elif isinstance(obj, _code):
+        return "code(%s,%s,%s)"%(hashlib.sha1(obj.co_code).hexdigest(),
+                _spec(obj.co_consts), _spec(obj.co_names))
+    elif isinstance(obj, type):
+        return "%s.%s"%(obj.__module__, getattr(obj, "__qualname__",
+                obj.__name__))
+    elif hasattr(obj, "__dict__"):
+        return "%s.%s%s"%(obj.__class__.__module__, obj.__class__.__name__,
+                _spec(vars(obj)))
+
+    # a repr with a memory address differs between processes
+    spec = repr(obj)
+    if " at 0x" in spec:
+        raise ValueError("No stable spec for %s; pass an explicit key."%spec)
+    return spec
+
+def spec_hash(sequence):
+
+    spec = _spec(sequence)
+    return hashlib.sha1(spec.encode("utf-8")).hexdigest()
+
+class PersistentCache(object):
+
+    def __init__(self, sequence, path, key=None):
+
+        self._sequence = sequence
+        self.key = spec_hash(sequence) if key is None else key
+
+        # each thread opens its own connection; close() may run anywhere
+        self._path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns = []
+
+        with self._conn:
+            self._conn.execute(_SCHEMA)
+
+    @property
+    def _conn(self):
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self._path,
+                    timeout=60, check_same_thread=False)
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _index(self, index):
+
+        return self._sequence._validate_index(index)
+
+    def get(self, index, default=None):
+
+        row = self._conn.execute("SELECT value FROM results WHERE "
+            "spec = ? AND idx = ?", (self.key, self._index(index))).fetchone()
+        return default if row is None else pickle.loads(bytes(row[0]))
+
+    def get_many(self, indices):
+
+        indices = [self._index(index) for index in indices]
+        found = {}
+        for begin in range(0, len(indices), _BATCH):
+            chunk = indices[begin:begin+_BATCH]
+            rows = self._conn.execute("SELECT idx, value FROM results "
+                "WHERE spec = ? AND idx IN (%s)"%",".join("?"*len(chunk)),
+                [self.key] + chunk)
+            for index, value in rows:
+                found[index] = pickle.loads(bytes(value))
+        return found
+
+    def put(self, index, value):
+
+        self.put_many(((index, value),))
+
+    def put_many(self, items):
+
+        rows = [(self.key, self._index(index),
+                sqlite3.Binary(pickle.dumps(value, 2)))
+                for index, value in items]
+        with self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO results "
+                "(spec, idx, value) VALUES (?, ?, ?)", rows)
+
+    def completed(self, start=0, stop=None):
+
+        query = "SELECT idx FROM results WHERE spec = ? AND idx >= ?"
+        args = [self.key, start]
+        if stop is not None and stop != INF:
+            query += " AND idx < ?"
+            args.append(stop)
+        for row in self._conn.execute(query + " ORDER BY idx", args):
+            yield row[0]
+
+    def pending(self, start=0, stop=None):
+
+        # walks the completed indices alongside the requested range
+        if stop is None:
+            stop = self._sequence.length()
+        done = self.completed(start, stop)
+        skip = next(done, None)
+        index = start
+        while index < stop:
+            if index == skip:
+                skip = next(done, None)
+            else:
+                yield index
+            index += 1
+
+    def evaluate(self, func, indices):
+
+        indices = [self._index(index) for index in indices]
+        found = self.get_many(indices)
+
+        computed = []
+        for index in indices:
+            if index not in found:
+                found[index] = func(self._sequence[index])
+                computed.append((index, found[index]))
+        self.put_many(computed)
+
+        return [found[index] for index in indices]
+
+    def clear(self):
+
+        with self._conn:
+            self._conn.execute("DELETE FROM results WHERE spec = ?",
+                (self.key,))
+
+    def close(self):
+
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+    def __contains__(self, index):
+
+        return self._conn.execute("SELECT 1 FROM results WHERE spec = ? "
+            "AND idx = ?", (self.key, self._index(index))).fetchone() is not None
+
+    def __len__(self):
+
+        return self._conn.execute("SELECT COUNT(*) FROM results WHERE "
+            "spec = ?", (self.key,)).fetchone()[0]
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc):
+
+        self.close()
@@ -0,0 +1,254 @@
+# coding: utf-8
+
+from __future__ import (unicode_literals, print_function,
+        division)
+
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from seqgentools.sequence import INF
+from seqgentools.store import spec_hash
+
+_SCHEMA = ("""CREATE TABLE IF NOT EXISTS meta (
+    sweep TEXT PRIMARY KEY,
+    length INTEGER,
+    cursor INTEGER NOT NULL)""",
+"""CREATE TABLE IF NOT EXISTS leases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sweep TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    done INTEGER NOT NULL,
+    next INTEGER NOT NULL,
+    stop INTEGER NOT NULL,
+    worker TEXT NOT NULL,
+    updated REAL NOT NULL)""",
+"""CREATE TABLE IF NOT EXISTS workers (
+    sweep TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    items INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (sweep, worker))""")
+
+class Sweep(object):
+
+    # a lease is the index range [start, stop) of one worker: indices below
+    # done are finished, indices below next are claimed, and the rest may
+    # be stolen by splitting the lease; a lease not updated for stale
+    # seconds is taken over as a whole
+
+    def __init__(self, sequence, path, key=None, lease=100000, chunk=1000,
+            stale=600.0):
+
+        if chunk < 1 or lease < chunk:
+            raise ValueError("Sweep needs 1 <= chunk <= lease.")
+
+        self._sequence = sequence
+        self._path = path
+        self.key = spec_hash(sequence) if key is None else key
+        self._lease = lease
+        self._chunk = chunk
+        self._stale = stale
+        self._local = threading.local()
+
+        _len = sequence.length()
+        with self._transaction() as conn:
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+            conn.execute("INSERT OR IGNORE INTO meta (sweep, length, cursor) "
+                "VALUES (?, ?, 0)", (self.key, None if _len == INF else _len))
+
+    def __getstate__(self):
+
+        state = dict(self.__dict__)
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def _conn(self):
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self._path,
+                    timeout=60, isolation_level=None)
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+
+        # BEGIN IMMEDIATE takes the write lock up front, so that reading a
+        # lease and changing it is atomic across processes
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _length(self, conn):
+
+        _len = conn.execute("SELECT length FROM meta WHERE sweep = ?",
+            (self.key,)).fetchone()[0]
+        return INF if _len is None else _len
+
+    def acquire(self, worker):
+
+        # returns the id of a lease with unclaimed indices, or None when
+        # nothing is left that is worth taking
+        now = time.time()
+        with self._transaction() as conn:
+            # a worker name stands for one sequential loop, so chunks it
+            # claimed but never completed are claimed again
+            row = conn.execute("SELECT id FROM leases WHERE sweep = ? AND "
+                "worker = ? AND done < stop ORDER BY start LIMIT 1",
+                (self.key, worker)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE leases SET next = done, updated = ? "
+                    "WHERE id = ?", (now, row[0]))
+                return row[0]
+
+            # fresh range from the untouched part of the sequence
+            cursor = conn.execute("SELECT cursor FROM meta WHERE sweep = ?",
+                (self.key,)).fetchone()[0]
+            _len = self._length(conn)
+            if cursor < _len:
+                stop = min(cursor + self._lease, _len)
+                conn.execute("UPDATE meta SET cursor = ? WHERE sweep = ?",
+                    (stop, self.key))
+                return self._insert(conn, cursor, stop, worker, now)
+
+            # a lease whose owner went quiet is taken over from its done
+            # mark, so claimed but unfinished chunks are processed again
+            row = conn.execute("SELECT id FROM leases WHERE sweep = ? AND "
+                "worker != ? AND done < stop AND updated < ? ORDER BY "
+                "stop - done DESC LIMIT 1", (self.key, worker,
+                now - self._stale)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE leases SET worker = ?, next = done, "
+                    "updated = ? WHERE id = ?", (worker, now, row[0]))
+                return row[0]
+
+            # otherwise split the largest unclaimed tail of another worker
+            row = conn.execute("SELECT id, next, stop FROM leases WHERE "
+                "sweep = ? AND worker != ? ORDER BY stop - next DESC "
+                "LIMIT 1", (self.key, worker)).fetchone()
+            if row is not None and row[2] - row[1] >= 2 * self._chunk:
+                lease, nxt, stop = row
+                mid = nxt + (stop - nxt) // 2
+                conn.execute("UPDATE leases SET stop = ? WHERE id = ?",
+                    (mid, lease))
+                return self._insert(conn, mid, stop, worker, now)
+
+    def _insert(self, conn, start, stop, worker, now):
+
+        return conn.execute("INSERT INTO leases (sweep, start, done, next, "
+            "stop, worker, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (self.key, start, start, start, stop, worker, now)).lastrowid
+
+    def claim(self, lease, worker):
+
+        # reserves the next chunk of a lease before it is processed; None
+        # when the lease was taken over or has nothing left
+        with self._transaction() as conn:
+            row = conn.execute("SELECT next, stop FROM leases WHERE id = ? "
+                "AND worker = ?", (lease, worker)).fetchone()
+            if row is None or row[0] >= row[1]:
+                return None
+            start, stop = row[0], min(row[0] + self._chunk, row[1])
+            conn.execute("UPDATE leases SET next = ?, updated = ? WHERE "
+                "id = ?", (stop, time.time(), lease))
+            return start, stop
+
+    def complete(self, lease, worker, span, seconds):
+
+        start, stop = span
+        now = time.time()
+        with self._transaction() as conn:
+            # a worker whose lease was taken over gets no credit
+            if not conn.execute("UPDATE leases SET done = ?, updated = ? "
+                    "WHERE id = ? AND worker = ? AND done = ?", (stop, now,
+                    lease, worker, start)).rowcount:
+                return
+            conn.execute("INSERT OR IGNORE INTO workers (sweep, worker, "
+                "items, seconds, updated) VALUES (?, ?, 0, 0.0, ?)",
+                (self.key, worker, now))
+            conn.execute("UPDATE workers SET items = items + ?, seconds = "
+                "seconds + ?, updated = ? WHERE sweep = ? AND worker = ?",
+                (stop - start, seconds, now, self.key, worker))
+
+    def chunks(self, worker):
+
+        # yields (start, stop) ranges to process; a chunk is marked
+        # complete when the next one is requested
+        while True:
+            lease = self.acquire(worker)
+            if lease is None:
+                return
+            span = self.claim(lease, worker)
+            if span is None:
+                continue
+            begin = time.time()
+            yield span
+            self.complete(lease, worker, span, time.time() - begin)
+
+    def work(self, worker, func):
+
+        count = 0
+        for start, stop in self.chunks(worker):
+            for index in range(start, stop):
+                func(index, self._sequence[index])
+            count += stop - start
+        return count
+
+    def throughput(self):
+
+        # items per second of every worker that completed a chunk
+        rows = self._conn.execute("SELECT worker, items, seconds FROM "
+            "workers WHERE sweep = ?", (self.key,))
+        return dict((worker, items / seconds if seconds > 0 else INF)
+                for worker, items, seconds in rows)
+
+    def leases(self):
+
+        return self._conn.execute("SELECT start, done, next, stop, worker "
+            "FROM leases WHERE sweep = ? ORDER BY start",
+            (self.key,)).fetchall()
+
+    def completed(self):
+
+        row = self._conn.execute("SELECT SUM(done - start) FROM leases "
+            "WHERE sweep = ?", (self.key,)).fetchone()
+        return row[0] or 0
+
+    def finished(self):
+
+        with self._transaction() as conn:
+            cursor = conn.execute("SELECT cursor FROM meta WHERE sweep = ?",
+                (self.key,)).fetchone()[0]
+            pending = conn.execute("SELECT COUNT(*) FROM leases WHERE "
+                "sweep = ? AND done < stop", (self.key,)).fetchone()[0]
+            return cursor >= self._length(conn) and pending == 0
+
+    def close(self):
+
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local = threading.local()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self, *exc):
+
+        self.close()
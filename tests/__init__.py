@@ -1,14 +1,29 @@
+import sys
 import unittest
 
 from .test_primitives import test_classes as primitive_tests
 from .test_algorithms import test_classes as algorithm_tests
+from .test_store import test_classes as store_tests
+from .test_threads import test_classes as thread_tests
+from .test_sweep import test_classes as sweep_tests
+
+if sys.version_info >= (3, 6):
+    from .test_aio import test_classes as aio_tests
+else:
+    aio_tests = ()
+
+if sys.version_info >= (3, 7):
+    from .test_startup import test_classes as startup_tests
+else:
+    startup_tests = ()
 
 def seqgentools_unittest_suite():
 
     loader = unittest.TestLoader()
     suite = unittest.TestSuite()
 
-    all_tests = primitive_tests + algorithm_tests
+    all_tests = (primitive_tests + algorithm_tests + store_tests +
+        thread_tests + sweep_tests + aio_tests + startup_tests)
 
     for test_class in all_tests:
         tests = loader.loadTestsFromTestCase(test_class)
@@ -0,0 +1,109 @@
+
+import asyncio
+import random
+import unittest
+
+import seqgentools as sgt
+
+class AsyncTests(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def _run(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def test_aiter(self):
+
+        async def collect(seq, N):
+            vals = []
+            async for val in seq:
+                vals.append(val)
+                if len(vals) == N:
+                    break
+            return vals
+
+        prod = sgt.Product(range(3), "ab")
+        self.assertEqual(self._run(collect(prod, 100)), list(prod))
+        self.assertEqual(self._run(collect(sgt.aiter(sgt.Count(), 5), 3)),
+            [5, 6, 7])
+
+    def test_amap_bounded(self):
+
+        state = {"running": 0, "peak": 0}
+
+        async def square(val):
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+            await asyncio.sleep(random.random() * 0.01)
+            state["running"] -= 1
+            return val * val
+
+        async def collect(ordered):
+            return [res async for res in sgt.amap(square, sgt.Range(40),
+                concurrency=4, ordered=ordered)]
+
+        results = self._run(collect(False))
+        self.assertEqual(sorted(results), [(i, i*i) for i in range(40)])
+        self.assertTrue(1 < state["peak"] <= 4)
+
+        results = self._run(collect(True))
+        self.assertEqual(results, [(i, i*i) for i in range(40)])
+
+    def test_amap_infinite_resume(self):
+
+        seen = []
+
+        async def ident(val):
+            await asyncio.sleep(random.random() * 0.005)
+            return val
+
+        async def sweep(start, N):
+            async with sgt.amap(ident, sgt.Count(), concurrency=5,
+                    start=start) as results:
+                async for index, val in results:
+                    seen.append(index)
+                    if len(seen) == N:
+                        break
+            return results
+
+        results = self._run(sweep(0, 20))
+        self.assertFalse(results._tasks)
+        resume = results.resume_index
+        self.assertTrue(all(idx in seen for idx in range(resume)))
+
+        results = self._run(sweep(resume, 40))
+        self.assertTrue(results.resume_index > resume)
+        self.assertEqual(set(range(results.resume_index)) - set(seen), set())
+
+    def test_amap_cancel(self):
+
+        cancelled = []
+
+        async def slow(val):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(val)
+                raise
+
+        async def consume():
+            async for _ in sgt.amap(slow, sgt.Count(), concurrency=3):
+                pass
+
+        async def main():
+            task = asyncio.ensure_future(consume())
+            await asyncio.sleep(0.01)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        self._run(main())
+        self.assertEqual(sorted(cancelled), [0, 1, 2])
+
+test_classes = (AsyncTests,)
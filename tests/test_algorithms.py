@@ -50,5 +50,424 @@ class AlgorithmTests(unittest.TestCase):
         for n in range(20):
             self.assertEqual(fibo[n], _fibo(n))
 
+    def test_multiset_permutations(self):
+
+        l = "AABBBC"
+        for r in range(len(l)+2):
+            ref = sorted(set(it.permutations(l, r)))
+            mperm = seq.MultisetPermutations(l, r=r)
+            self.assertEqual(len(mperm), len(ref))
+            self._iter_equals(mperm, iter(ref))
+            for idx, val in enumerate(ref):
+                self.assertEqual(mperm.index(val), idx)
+
+        mperm = seq.MultisetPermutations("AB", counts=(2, 1))
+        self.assertEqual(list(mperm), [('A', 'A', 'B'), ('A', 'B', 'A'),
+            ('B', 'A', 'A')])
+        self.assertRaises(seq.IndexNotFound, mperm.index, "BBA")
+
+    def test_multiset_combinations(self):
+
+        l = "AABBBC"
+        for r in range(len(l)+2):
+            ref = sorted(set(it.combinations(l, r)))
+            mcomb = seq.MultisetCombinations(l, r)
+            self.assertEqual(len(mcomb), len(ref))
+            self._iter_equals(mcomb, iter(ref))
+            for idx, val in enumerate(ref):
+                self.assertEqual(mcomb.index(val), idx)
+
+        mcomb = seq.MultisetCombinations("ABC", 2, counts=(1, 2, 0))
+        self.assertEqual(list(mcomb), [('A', 'B'), ('B', 'B')])
+        self.assertRaises(seq.IndexNotFound, mcomb.index, "BA")
+        self.assertRaises(seq.IndexNotFound, mcomb.index, "CC")
+
+    def test_set_partitions(self):
+
+        self.assertEqual([seq.bell(n) for n in range(8)],
+            [1, 1, 2, 5, 15, 52, 203, 877])
+        self.assertEqual(seq.stirling2(6, 3), 90)
+
+        parts = seq.SetPartitions("abc")
+        self.assertEqual(list(parts), [(('a', 'b', 'c'),),
+            (('a', 'b'), ('c',)), (('a', 'c'), ('b',)),
+            (('a',), ('b', 'c')), (('a',), ('b',), ('c',))])
+
+        parts = seq.SetPartitions(range(7), k=3)
+        self.assertEqual(len(parts), 301)
+        for idx in range(len(parts)):
+            self.assertEqual(parts.index(parts[idx]), idx)
+        self.assertRaises(seq.IndexNotFound, parts.index,
+            ((1, 2), (0, 3, 4), (5, 6)))
+
+    def test_grouping_repeated(self):
+
+        for parts in (seq.SetPartitions("aab"), seq.SetPartitions("abab"),
+                seq.Assignments("aab", 2), seq.Assignments("aba", 2)):
+            vals = list(parts)
+            for val in vals:
+                self.assertEqual(parts.index(val), vals.index(val))
+
+    def test_assignments(self):
+
+        assign = seq.Assignments("abcd", 2)
+        self.assertEqual(len(assign), 14)
+        self.assertEqual(assign[0], (('a', 'b', 'c'), ('d',)))
+        self.assertEqual(assign[13], (('d',), ('a', 'b', 'c')))
+        for idx in range(len(assign)):
+            self.assertEqual(assign.index(assign[idx]), idx)
+        self.assertRaises(seq.IndexNotFound, assign.index,
+            (('a', 'b', 'c', 'd'), ()))
+
+    def test_compositions(self):
+
+        n = 6
+        for k in (None, 3):
+            ref = sorted(t for m in range(n+1) for t in
+                it.product(range(1, n+1), repeat=m)
+                if sum(t) == n and (k is None or m == k))
+            comps = seq.Compositions(n, k=k)
+            self.assertEqual(list(comps), ref)
+            for idx, val in enumerate(ref):
+                self.assertEqual(comps.index(val), idx)
+
+        self.assertEqual(seq.Compositions(5, k=-1).length(), 0)
+        self.assertEqual(list(seq.Compositions(5, k=-1)), [])
+
+    def test_integer_partitions(self):
+
+        self.assertEqual(list(seq.IntegerPartitions(4)), [(1, 1, 1, 1),
+            (2, 1, 1), (2, 2), (3, 1), (4,)])
+        self.assertEqual(list(seq.IntegerPartitions(6, k=2)), [(3, 3),
+            (4, 2), (5, 1)])
+        self.assertEqual(seq.npartitions(100), 190569292)
+
+        parts = seq.IntegerPartitions(12)
+        for idx in range(len(parts)):
+            self.assertEqual(parts.index(parts[idx]), idx)
+        self.assertRaises(seq.IndexNotFound, parts.index, (1, 11))
+
+    def test_gray_product(self):
+
+        pools = (range(3), "ab", range(4))
+        gray = seq.GrayProduct(*pools)
+        vals = list(gray)
+        self.assertEqual(sorted(vals), sorted(it.product(*pools)))
+        for idx, val in enumerate(vals):
+            self.assertEqual(gray.index(val), idx)
+
+        changes = list(gray.iterchanges(start=5))
+        self.assertEqual([val for val, _ in changes], vals[5:])
+        for (prev, _), (cur, dim) in zip(changes, changes[1:]):
+            self.assertEqual([d for d in range(3) if prev[d] != cur[d]],
+                [dim])
+
+    def test_revolving_door_combinations(self):
+
+        l = range(7)
+        for r in range(len(l)+1):
+            comb = seq.RevolvingDoorCombinations(l, r)
+            vals = list(comb)
+            self.assertEqual(sorted(vals), list(it.combinations(l, r)))
+            for idx, val in enumerate(vals):
+                self.assertEqual(comb.index(val), idx)
+
+            changes = list(comb.iterchanges(start=1))
+            self.assertEqual([val for val, _ in changes], vals[1:])
+            for (prev, _), (cur, (removed, added)) in zip(changes,
+                    changes[1:]):
+                self.assertEqual(set(prev) - set(cur), set([removed]))
+                self.assertEqual(set(cur) - set(prev), set([added]))
+
+        comb = seq.RevolvingDoorCombinations("abcab", 3)
+        for val in comb:
+            self.assertEqual(comb[comb.index(val)], val)
+        self.assertRaises(seq.IndexNotFound, comb.index, ("b", "b", "b"))
+
+    def test_sjt_permutations(self):
+
+        self.assertEqual(list(seq.SJTPermutations("abc")),
+            [('a', 'b', 'c'), ('a', 'c', 'b'), ('c', 'a', 'b'),
+             ('c', 'b', 'a'), ('b', 'c', 'a'), ('b', 'a', 'c')])
+
+        perm = seq.SJTPermutations(range(5))
+        vals = list(perm)
+        self.assertEqual(sorted(vals), list(it.permutations(range(5))))
+        for idx, val in enumerate(vals):
+            self.assertEqual(perm.index(val), idx)
+
+        changes = list(perm.iterchanges(start=7, stop=100))
+        self.assertEqual([val for val, _ in changes], vals[7:100])
+        for (prev, _), (cur, pos) in zip(changes, changes[1:]):
+            self.assertEqual((prev[pos], prev[pos+1]), (cur[pos+1], cur[pos]))
+
+        perm = seq.SJTPermutations("aab")
+        for val in perm:
+            self.assertEqual(perm[perm.index(val)], val)
+        self.assertRaises(seq.IndexNotFound, perm.index, ("a", "b", "b"))
+
+    def test_product_traversals(self):
+
+        prod = seq.Product(range(6), "abc", range(4))
+        for order in (seq.VanDerCorput, seq.Halton, seq.LatinHypercube):
+            view = order(prod)
+            self.assertEqual(len(view), len(prod))
+            parents = [view.to_parent(idx) for idx in range(len(view))]
+            self.assertEqual(sorted(parents), list(range(len(prod))))
+            for idx, parent in enumerate(parents):
+                self.assertEqual(view.from_parent(parent), idx)
+                self.assertEqual(view[idx], prod[parent])
+                self.assertEqual(view.index(view[idx]), idx)
+            self.assertEqual(list(view[10:20]),
+                [view[idx] for idx in range(10, 20)])
+
+    def test_product_traversal_coverage(self):
+
+        prod = seq.Product(range(8), range(8))
+
+        halton = seq.Halton(prod)
+        quadrants = set((x // 4, y // 4) for x, y in halton[0:4])
+        self.assertEqual(len(quadrants), 4)
+
+        vdc = seq.VanDerCorput(prod)
+        self.assertEqual([x for x, _ in vdc[0:4]], [0, 4, 2, 6])
+
+        lhs = seq.LatinHypercube(seq.Product(range(6), range(3)))
+        for start in range(0, 18, 6):
+            xs, ys = zip(*lhs[start:start+6])
+            self.assertEqual(sorted(xs), list(range(6)))
+            self.assertEqual(sorted(ys), [0, 0, 1, 1, 2, 2])
+
+    def test_diagonal_product(self):
+
+        for pairing in ("szudzik", "cantor"):
+            diag = seq.DiagonalProduct(seq.Count(), seq.Count(),
+                    seq.Count(), pairing=pairing)
+            points = diag[0:1000]
+            self.assertEqual(len(set(points)), 1000)
+            for idx in (0, 1, 17, 999, 10**40, 10**40 + 3):
+                self.assertEqual(diag.index(diag[idx]), idx)
+
+        diag = seq.DiagonalProduct(seq.Count(), seq.Count())
+        self.assertEqual(sorted(diag[0:16]),
+                list(it.product(range(4), range(4))))
+
+        mixed = seq.DiagonalProduct(seq.Count(), "ab", seq.Count(5, 3))
+        self.assertEqual(list(mixed[0:3]), [(0, 'a', 5), (0, 'b', 5),
+                (0, 'a', 8)])
+        self.assertEqual(mixed.index((3, 'b', 14)),
+                list(mixed[0:100]).index((3, 'b', 14)))
+
+        finite = seq.DiagonalProduct(range(3), "ab")
+        self.assertEqual(list(finite), list(it.product(range(3), "ab")))
+
+    def test_interleave(self):
+
+        inter = seq.Interleave("abc", seq.Count(10), "de", seq.Count(0, -1))
+        self.assertEqual(inter.length(), seq.INF)
+        self.assertEqual(list(inter[0:12]), ['a', 10, 'd', 0, 'b', 11, 'e',
+                -1, 'c', 12, -2, 13])
+        for idx in range(50):
+            self.assertEqual(inter.index(inter[idx]), idx)
+
+        inter = seq.Interleave("abcd", "xy", range(3))
+        self.assertEqual(list(inter), ['a', 'x', 0, 'b', 'y', 1, 'c', 2,
+                'd'])
+
+    def test_weighted_product(self):
+
+        pools = (range(5), "abcd", range(3))
+        weights = ([0, 3, 1, 3, 2], lambda char: -ord(char), [1.5, 0, 2])
+        prod = seq.WeightedProduct(*pools, weights=weights)
+        points = list(prod)
+        self.assertEqual(sorted(points), sorted(it.product(*pools)))
+
+        scores = [prod.score(idx) for idx in range(len(prod))]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual(points[0], (1, 'a', 2))
+        self.assertEqual(prod.topk(3), points[:3])
+
+        lexical = seq.Product(*pools)
+        for idx, point in enumerate(points):
+            self.assertEqual(lexical[prod.to_parent(idx)], point)
+
+        fresh = seq.WeightedProduct(*pools, weights=weights)
+        for idx in (37, 2, 59):
+            self.assertEqual(fresh.index(points[idx]), idx)
+        self.assertEqual(fresh.copy()[11], points[11])
+
+        self.assertEqual(list(seq.WeightedProduct(range(2), "ab")),
+                list(it.product(range(2), "ab")))
+
+        # only frontier snapshots are kept, one per stride of positions
+        big = seq.WeightedProduct(range(20), range(20), range(20),
+                weights=[lambda x: x % 7, lambda x: -x, None])
+        stride = big._STRIDE
+        point = big[3*stride + 5]
+        self.assertEqual(len(big._checkpoints), 4)
+        fresh = seq.WeightedProduct(range(20), range(20), range(20),
+                weights=[lambda x: x % 7, lambda x: -x, None])
+        self.assertEqual(fresh.index(point), 3*stride + 5)
+        self.assertEqual(fresh.score(3*stride + 5), big.score(3*stride + 5))
+
+    def test_product_subspaces(self):
+
+        prod = seq.Product(range(4), "abc", range(5))
+        points = list(it.product(range(4), "abc", range(5)))
+
+        fixed = prod.fix(2, 3)
+        self.assertEqual(list(fixed), [p for p in points if p[2] == 3])
+        self.assertTrue(fixed._pools[-1] is prod._pools[-1])
+
+        fixed = prod.fix({0: 2, 1: "c"})
+        self.assertEqual(list(fixed), [p for p in points if p[:2] == (2, "c")])
+
+        base = prod.index((1, "b", 4))
+        plane = prod.project([0, 2], base=base)
+        self.assertEqual(list(plane), [p for p in points if p[1] == "b"])
+
+        sub = prod.restrict(1, "ca").fix(0, 3).restrict(2, [4, 0])
+        self.assertEqual(list(sub), [(3, "c", 4), (3, "c", 0), (3, "a", 4),
+                (3, "a", 0)])
+
+        # nested views look values up through the original pools
+        twice = prod.fix(0, 1).fix(0, 1)
+        self.assertEqual(list(twice), [p for p in points if p[0] == 1])
+        corner = plane.fix(2, 0)
+        self.assertEqual(list(corner), [(x, "b", 0) for x in range(4)])
+        self.assertEqual(list(prod.fix(0, 1).restrict(0, [1])), list(twice))
+        self.assertRaises(seq.IndexNotFound, prod.fix(0, 1).fix, 0, 2)
+
+        for view in (fixed, plane, sub, twice, corner):
+            for idx in range(len(view)):
+                parent = view.to_parent(idx)
+                self.assertEqual(prod[parent], view[idx])
+                self.assertEqual(view.from_parent(parent), idx)
+                self.assertEqual(view.index(view[idx]), idx)
+        self.assertRaises(seq.IndexNotFound, sub.from_parent, 0)
+        self.assertRaises(seq.IndexNotFound, sub.index, (3, "b", 4))
+        self.assertTrue((3, "a", 0) in sub)
+        self.assertFalse((2, "a", 0) in sub)
+        self.assertFalse((2, "a", 0) in fixed)
+
+    def test_necklaces_bracelets(self):
+
+        def rotations(word):
+            return [word[idx:] + word[:idx] for idx in range(len(word))]
+
+        words = list(it.product("abc", repeat=6))
+        necklaces = sorted(set(min(rotations(w)) for w in words))
+        bracelets = sorted(set(min(rotations(w) + rotations(w[::-1]))
+                for w in words))
+
+        neck = seq.Necklaces("abc", 6)
+        self.assertEqual(list(neck), necklaces)
+        for idx, word in enumerate(necklaces):
+            self.assertEqual(neck.index(word), idx)
+        self.assertEqual(neck.canonical("cabcab"), tuple("abcabc"))
+        self.assertRaises(seq.IndexNotFound, neck.index, "cabcab")
+
+        brace = seq.Bracelets("abc", 6)
+        self.assertEqual(brace.length(), len(bracelets))
+        self.assertEqual(list(brace), bracelets)
+        for idx, word in enumerate(bracelets):
+            self.assertEqual(brace.index(word), idx)
+
+        neck = seq.Necklaces(range(4), 30)
+        idx = neck.length() // 3
+        self.assertEqual(neck.index(neck[idx]), idx)
+
+        brace = seq.Bracelets("ab", 11)
+        bracelets = sorted(set(min(rotations(w) + rotations(w[::-1]))
+                for w in it.product("ab", repeat=11)))
+        for idx in (0, 17, len(bracelets) - 1):
+            self.assertEqual(brace[idx], bracelets[idx])
+            self.assertEqual(brace.index(bracelets[idx]), idx)
+        brace = seq.Bracelets(range(3), 14)
+        idx = brace.length() // 3
+        self.assertEqual(brace.index(brace[idx]), idx)
+
+    def test_sorted_product(self):
+
+        pools = ([3, 1, 2], [2, 5, 1, 4], [0, 2, 4, 6])
+        sortp = seq.SortedProduct(*pools)
+        points = sorted(p for p in it.product(*pools) if p[0] <= p[1] <= p[2])
+        self.assertEqual(list(sortp), points)
+        for idx, point in enumerate(points):
+            self.assertEqual(sortp.index(point), idx)
+
+        self.assertEqual(list(seq.SortedProduct(range(5), range(5))),
+                list(it.combinations_with_replacement(range(5), 2)))
+
+    def test_orbits(self):
+
+        prod = seq.Product(range(3), range(3), "ab", range(3))
+        orbits = seq.Orbits(prod, [(1, 0, 2, 3), (3, 1, 2, 0)])
+        orbits._STRIDE = 4
+        self.assertEqual(orbits.length(), 20)
+
+        reps = it.combinations_with_replacement(range(3), 3)
+        points = [(x, y, c, z) for x, y, z in reps for c in "ab"]
+        self.assertEqual(sorted(orbits), sorted(points))
+        for idx, point in enumerate(orbits):
+            self.assertEqual(orbits.index(point), idx)
+            self.assertEqual(prod[orbits.to_parent(idx)], point)
+        self.assertEqual(orbits.canonical((2, 1, "b", 0)), (0, 1, "b", 2))
+
+        cyclic = seq.Orbits(seq.Product(range(4), repeat=3), [(1, 2, 0)])
+        self.assertEqual(list(cyclic), list(seq.Necklaces(range(4), 3)))
+
+    def test_rank_plan(self):
+
+        nested = seq.Product(seq.Permutations(range(5), 3),
+                seq.CombinationRange("abcd"), seq.Cycle(range(7))[2:30:4],
+                seq.Combinations_with_replacement("xyz", 2))
+        plan = seq.RankPlan(nested)
+        self.assertEqual(plan.length(), nested.length())
+        self.assertEqual([step[1] for step in plan.steps()[:3]],
+                ["mixed-radix", "factoradic", "leaf lookup"])
+
+        indices = list(range(0, plan.length(), 97)) + [-1]
+        values = plan.unrank_many(indices)
+        self.assertEqual(values, [nested[idx] for idx in indices])
+        self.assertEqual(plan.rank_many(values[:-1]), indices[:-1])
+        self.assertEqual(plan.rank(values[-1]), plan.length() - 1)
+
+        for r in range(5):
+            for ref, plan in ((it.permutations("abcd", r),
+                    seq.RankPlan(seq.Permutations("abcd", r))),
+                    (it.combinations("abcd", r),
+                    seq.RankPlan(seq.Combinations("abcd", r))),
+                    (it.combinations_with_replacement("abc", r),
+                    seq.RankPlan(seq.Combinations_with_replacement("abc", r)))):
+                for idx, val in enumerate(ref):
+                    self.assertEqual(plan.unrank(idx), val)
+                    self.assertEqual(plan.rank(val), idx)
+
+        # pools with repeated elements rank to the first occurrence
+        for dup in (seq.Permutations("AAB"), seq.Permutations("ABAB", 3),
+                seq.Combinations("AABA", 2), seq.CombinationRange("ABA"),
+                seq.Combinations_with_replacement("ABA", 3),
+                seq.Wrapper("abab")[2:4], seq.Wrapper("abab")[::-1],
+                seq.Wrapper("aabba")[1::2]):
+            plan, items = seq.RankPlan(dup), list(dup)
+            for val in items:
+                self.assertEqual(plan.rank(val), items.index(val))
+        self.assertRaises(seq.RankError, seq.RankPlan(seq.Permutations(
+                "AAB", 2)).rank, ("B", "B"))
+
+        plan = seq.RankPlan(nested)
+        with self.assertRaises(seq.RankError) as ctx:
+            plan.rank(((0, 1, 2), ("a",), 9, ("x", "x")))
+        self.assertEqual(ctx.exception.path, (2, 0, 0))
+        with self.assertRaises(seq.RankError) as ctx:
+            plan.rank(((0, 1, 2), ("a",), 6, ("y", "x")))
+        self.assertEqual(ctx.exception.path, (3,))
+        self.assertEqual(ctx.exception.sequence.__class__.__name__,
+                "Combinations_with_replacement")
+        self.assertRaises(seq.IndexNotFound, plan.rank, ((0, 0, 1), (), 2,
+                ("x", "y")))
+        self.assertRaises(IndexError, plan.unrank, plan.length())
+
 test_classes = (AlgorithmTests,)
 
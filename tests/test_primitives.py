@@ -173,6 +173,114 @@ class PrimitiveSequenceTests(unittest.TestCase):
         combrange = it.chain(*comb)
         self._iter_equals(sgt.CombinationRange(l, start=1, stop=len(l), step=2), combrange)
 
+    def test_slice(self):
+
+        l = list(range(10))
+        for slc in ((None, None, None), (2, 8, None), (-3, None, None),
+                (None, -2, 3), (8, 1, -2), (None, None, -1), (20, 30, 1)):
+            self.assertEqual(list(sgt.Range(10)[slice(*slc)]),
+                l[slice(*slc)])
+
+        self.assertEqual(sgt.Count()[5:].length(), sgt.INF)
+        self.assertEqual(list(sgt.Count()[10:0:-3]), [10, 7, 4, 1])
+        self.assertRaises(TypeError, sgt.Slice, sgt.Count(), slice(-1, None))
+
+    def test_islice(self):
+
+        self._iter_equals(sgt.Islice(sgt.Count(), 2, 50, 3),
+            it.islice(it.count(), 2, 50, 3))
+        self._iter_equals(sgt.Islice(sgt.Cycle("abc"), 5),
+            it.islice(it.cycle("abc"), 5))
+        self.assertEqual(sgt.Islice(sgt.Count(), 3, None, 2)[4], 11)
+        self.assertRaises(ValueError, sgt.Islice, sgt.Count(), -1)
+
+    def test_batched(self):
+
+        batches = sgt.Batched(range(10), 4)
+        self.assertEqual(len(batches), 3)
+        self.assertTrue(isinstance(batches[0], sgt.Slice))
+        self.assertEqual([b.getitems() for b in batches],
+            [(0, 1, 2, 3), (4, 5, 6, 7), (8, 9)])
+
+        batches = sgt.Batched(sgt.Count(), 4)
+        self.assertEqual(batches.length(), sgt.INF)
+        self.assertEqual(batches.getitems(1000), (4000, 4001, 4002, 4003))
+
+    def test_windowed(self):
+
+        windows = sgt.Windowed(range(7), 3, step=2)
+        self.assertEqual([w.getitems() for w in windows],
+            [(0, 1, 2), (2, 3, 4), (4, 5, 6)])
+        self.assertEqual(len(sgt.Windowed(range(2), 3)), 0)
+        self.assertEqual(sgt.Windowed(sgt.Count(), 2).getitems(5), (5, 6))
+
+    def test_copy(self):
+
+        import copy
+
+        prod = sgt.Product(range(3), "abc")
+        prod[4]
+        next(prod)
+        for dup in (prod.copy(), copy.copy(prod), copy.deepcopy(prod)):
+            self.assertTrue(dup is not prod)
+            self.assertTrue(dup._pools is prod._pools)
+            self.assertEqual(dup._cache, {})
+            self.assertTrue(dup._cache is not prod._cache)
+            self.assertEqual(list(dup), list(it.product(range(3), "abc")))
+
+        chain = sgt.Chain(*[sgt.Range(idx) for idx in range(1, 2000)])
+        dup = copy.deepcopy([chain, chain])
+        self.assertTrue(dup[0] is dup[1])
+        self.assertTrue(dup[0]._sequences is chain._sequences)
+        self.assertEqual(dup[0][-1], chain[-1])
+
+        perms = sgt.PermutationRange("abcd", start=2, stop=3)
+        self.assertEqual(list(perms.copy()), list(it.permutations("abcd", 2)))
+
+    def test_optimize(self):
+
+        seq = (sgt.Range(10) + sgt.Range(10, 20))[2:18][1:13:2]
+        self.assertEqual(list(seq), list(range(20))[2:18][1:13:2])
+        opt = sgt.optimize(seq)
+        self.assertTrue(type(opt) is sgt.Range)
+        self.assertEqual(list(opt), list(seq))
+
+        seq = sgt.Count(3, 2)[5:][::3]
+        self.assertTrue(type(sgt.optimize(seq)) is sgt.Count)
+        self._iter_equals(seq, it.count(13, 6), N=100)
+
+        seq = sgt.Chain(sgt.Chain("ab", "cd"), sgt.Repeat(None, 2),
+                sgt.Repeat(None, 3))
+        opt = sgt.optimize(seq)
+        self.assertEqual(len(opt._sequences), 3)
+        self.assertEqual(list(opt), list(seq))
+
+        self.assertTrue(type(sgt.optimize(sgt.Cycle(sgt.Repeat(1, 3))))
+                is sgt.Repeat)
+        self.assertEqual(list(sgt.Count(5, 0)[0:3]), [5, 5, 5])
+        self.assertEqual(sgt.Count(5, 0)[0:3][2], 5)
+        stored = sgt.Range(10)[2:5]
+        self.assertTrue(sgt.Wrapper([stored])[0] is stored)
+
+        empty = sgt.Cycle(sgt.Repeat(5, 0))
+        self.assertTrue(type(sgt.optimize(empty)) is sgt.Cycle)
+        self.assertEqual(empty[3], None)
+
+        prod = sgt.Product(range(6), "abc", range(2))
+        opt = sgt.optimize(prod[6:30])
+        self.assertTrue(type(opt) is sgt.Product)
+        self.assertEqual(list(opt), list(it.product(range(6), "abc",
+                range(2)))[6:30])
+
+        data = list(range(30))
+        for slc1 in (slice(None), slice(-4, 2, -3), slice(40, None, -1)):
+            for slc2 in (slice(3, None), slice(None, None, -2),
+                    slice(-35, 3)):
+                seq = sgt.Wrapper(data)[slc1][slc2]
+                self.assertEqual(list(seq), data[slc1][slc2])
+                opt = sgt.optimize(sgt.Wrapper(data)[slc1][slc2])
+                self.assertEqual(list(opt), data[slc1][slc2])
+
     def test_custom(self):
 
         # TODO: complete this test
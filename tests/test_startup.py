@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import seqgentools as sgt
+
+_PROBE = """
+import sys
+import seqgentools
+print(" ".join(sorted(sys.modules)))
+"""
+
+class StartupTests(unittest.TestCase):
+
+    def _probe(self):
+
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, "-c", _PROBE],
+                cwd=root).decode("utf-8")
+        return set(output.split())
+
+    def test_lazy_modules(self):
+
+        # a bare import loads none of the heavy modules
+        modules = self._probe()
+        for name in ("seqgentools.algorithms.combinatorics",
+                "seqgentools.algorithms.symmetry", "seqgentools.store",
+                "seqgentools.aio", "sqlite3", "asyncio"):
+            self.assertNotIn(name, modules)
+
+        self.assertTrue(sgt.Necklaces is
+                sgt.algorithms.symmetry.Necklaces)
+        self.assertIn("WeightedProduct", dir(sgt))
+        self.assertIn("optimize", dir(sgt))
+        self.assertRaises(AttributeError, getattr, sgt, "NoSuchSequence")
+
+    def test_star_import(self):
+
+        for module in ("seqgentools", "seqgentools.algorithms"):
+            names = {}
+            exec("from %s import *"%module, names)
+            self.assertTrue(names["Product"] is sgt.Product)
+            self.assertTrue(names["HSS"] is sgt.HSS)
+            self.assertIn("nCr", names)
+
+        self.assertEqual(len(set(sgt.__all__)), len(sgt.__all__))
+        for name in sgt.__all__:
+            self.assertTrue(hasattr(sgt, name), name)
+
+test_classes = (StartupTests,)
@@ -0,0 +1,103 @@
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import seqgentools as sgt
+
+class PersistentCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "results.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_spec_hash(self):
+
+        prod = sgt.Product(range(3), "abc")
+        self.assertEqual(sgt.spec_hash(prod),
+            sgt.spec_hash(sgt.Product(range(3), "abc")))
+        self.assertNotEqual(sgt.spec_hash(prod),
+            sgt.spec_hash(sgt.Product(range(3), "abd")))
+
+        # lookups and iteration do not change the hash
+        key = sgt.spec_hash(prod)
+        list(prod)
+        prod[4]
+        self.assertEqual(sgt.spec_hash(prod), key)
+
+        # derived tables stay out of the spec, weights do not
+        spec = sgt.store._spec(sgt.IntegerPartitions(150, k=20))
+        self.assertNotIn("_parts", spec)
+        self.assertLess(len(spec), 200)
+        weighted = [sgt.spec_hash(sgt.WeightedProduct(range(4), "ab",
+                weights=[weight, None])) for weight in (lambda x: -x,
+                lambda x: x % 2, lambda x: x % 2)]
+        self.assertNotEqual(weighted[0], weighted[1])
+        self.assertEqual(weighted[1], weighted[2])
+
+        # closed over values and defaults are part of a function spec
+        def scaled(w):
+            return lambda x: x * w
+        def shifted(w):
+            return lambda x, w=w: x + w
+        for make in (scaled, shifted):
+            hashes = [sgt.spec_hash(sgt.Wrapper([make(w)]))
+                    for w in (2, 3, 3)]
+            self.assertNotEqual(hashes[0], hashes[1])
+            self.assertEqual(hashes[1], hashes[2])
+        token = object()
+        self.assertRaises(ValueError, sgt.spec_hash,
+                sgt.Wrapper([lambda x: x if token else -x]))
+        self.assertRaises(ValueError, sgt.spec_hash, sgt.Wrapper([object()]))
+
+    def test_get_put(self):
+
+        prod = sgt.Product(range(10), repeat=2)
+        with sgt.PersistentCache(prod, self.path) as cache:
+            self.assertEqual(cache.get(5), None)
+            cache.put(5, {"score": 1.5})
+            cache.put_many((idx, idx * 2) for idx in range(10, 20))
+            self.assertEqual(cache.get(5), {"score": 1.5})
+            self.assertTrue(15 in cache)
+            self.assertEqual(cache.get(-1, "missing"), "missing")
+            self.assertEqual(cache.get_many([5, 11, 50]),
+                {5: {"score": 1.5}, 11: 22})
+
+        # a fresh process rebuilding the same space sees the results
+        prod = sgt.Product(range(10), repeat=2)
+        with sgt.PersistentCache(prod, self.path) as cache:
+            self.assertEqual(len(cache), 11)
+            self.assertEqual(cache.get(12), 24)
+
+        other = sgt.Product(range(11), repeat=2)
+        with sgt.PersistentCache(other, self.path) as cache:
+            self.assertEqual(len(cache), 0)
+
+    def test_resume(self):
+
+        space = sgt.Permutations(range(5), 3)
+        calls = []
+
+        def score(point):
+            calls.append(point)
+            return sum(point)
+
+        with sgt.PersistentCache(space, self.path) as cache:
+            self.assertEqual(cache.evaluate(score, range(0, 20, 2)),
+                [sum(space[idx]) for idx in range(0, 20, 2)])
+
+        with sgt.PersistentCache(space, self.path) as cache:
+            self.assertEqual(list(cache.completed(stop=10)), [0, 2, 4, 6, 8])
+            pending = list(cache.pending(0, 30))
+            self.assertEqual(pending, [idx for idx in range(30) if
+                idx % 2 or idx >= 20])
+            self.assertEqual(cache.evaluate(score, range(30)),
+                [sum(space[idx]) for idx in range(30)])
+
+        self.assertEqual(len(calls), 30)
+
+test_classes = (PersistentCacheTests,)
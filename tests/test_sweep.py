@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import seqgentools as sgt
+
+def _space():
+    return sgt.Product(range(40), range(50))
+
+def _worker(ledger, results, name, delay):
+
+    # stands in for a node: sweeps its share and stores every value
+    space = _space()
+    sweep = sgt.Sweep(space, ledger, lease=500, chunk=20, stale=60)
+    cache = sgt.PersistentCache(space, results)
+    for start, stop in sweep.chunks(name):
+        time.sleep(delay)
+        cache.put_many((idx, sum(space[idx])) for idx in range(start, stop))
+    cache.close()
+    sweep.close()
+
+class SweepTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.ledger = os.path.join(self.tmpdir, "ledger.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_leases(self):
+
+        sweep = sgt.Sweep(sgt.Range(1000), self.ledger, lease=1000,
+                chunk=10, stale=60)
+
+        first = sweep.acquire("a")
+        self.assertEqual(sweep.claim(first, "a"), (0, 10))
+
+        # nothing left to lease, so b splits the unclaimed tail of a
+        second = sweep.acquire("b")
+        self.assertEqual(sweep.leases(), [(0, 0, 10, 505, "a"),
+                (505, 505, 505, 1000, "b")])
+        self.assertEqual(sweep.claim(second, "b"), (505, 515))
+        sweep.complete(first, "a", (0, 10), 0.5)
+        self.assertEqual(sweep.completed(), 10)
+
+        # quiet leases are taken over from their done mark
+        quick = sgt.Sweep(sgt.Range(1000), self.ledger, lease=1000,
+                chunk=10, stale=0)
+        time.sleep(0.01)
+        self.assertEqual(quick.acquire("c"), first)
+        self.assertEqual(sweep.claim(first, "a"), None)
+
+        seen = []
+        for name in "abc":
+            sweep.work(name, lambda idx, val: seen.append(val))
+        self.assertEqual(sorted(seen), list(range(10, 1000)))
+        self.assertTrue(sweep.finished())
+        self.assertEqual(set(sweep.throughput()), set("abc"))
+
+    def test_processes(self):
+
+        results = os.path.join(self.tmpdir, "results.db")
+        space = _space()
+        sweep = sgt.Sweep(space, self.ledger, lease=500, chunk=20, stale=60)
+
+        # the slow node starts with a lease so that others must steal
+        sweep.acquire("slow")
+        procs = [multiprocessing.Process(target=_worker, args=(self.ledger,
+                results, name, delay)) for name, delay in (("slow", 0.05),
+                ("fast1", 0.002), ("fast2", 0.002))]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+            self.assertEqual(proc.exitcode, 0)
+
+        self.assertTrue(sweep.finished())
+        self.assertGreater(len(sweep.leases()), 4)
+        self.assertEqual(set(sweep.throughput()), set(["slow", "fast1",
+                "fast2"]))
+
+        cache = sgt.PersistentCache(space, results)
+        self.assertEqual(cache.get_many(range(len(space))), dict((idx,
+                sum(space[idx])) for idx in range(len(space))))
+        cache.close()
+
+test_classes = (SweepTests,)
@@ -0,0 +1,182 @@
+import os
+import pickle
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+import seqgentools as sgt
+
+NTHREADS = 16
+
+def _hammer(func, nthreads=NTHREADS):
+
+    # runs func(tid) on many threads at once and returns their results
+    results, errors = [None] * nthreads, []
+    start = threading.Event()
+
+    def run(tid):
+        start.wait()
+        try:
+            results[tid] = func(tid)
+        except Exception as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=run, args=(tid,))
+            for tid in range(nthreads)]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return results
+
+class ThreadTests(unittest.TestCase):
+
+    def setUp(self):
+
+        # switch threads as often as possible to provoke interleavings
+        if hasattr(sys, "setswitchinterval"):
+            self.interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+
+        if hasattr(sys, "setswitchinterval"):
+            sys.setswitchinterval(self.interval)
+
+    def _check(self, build, indices):
+
+        # every thread looks up a shuffled copy of indices on one shared
+        # sequence; the answers must match a serial run on a fresh one
+        serial = build()
+        expected = dict((idx, serial[idx]) for idx in indices)
+        shared = build()
+
+        def lookup(tid):
+            order = list(indices)
+            random.Random(tid).shuffle(order)
+            return dict((idx, shared[idx]) for idx in order)
+
+        for result in _hammer(lookup):
+            self.assertEqual(result, expected)
+        return shared
+
+    def test_lookups(self):
+
+        self._check(lambda: sgt.Product(range(7), "abcde", range(9)),
+                range(315))
+        self._check(lambda: (sgt.Range(50) + sgt.Count(100))[3:][::2][1:],
+                range(200))
+        self._check(lambda: sgt.DiagonalProduct(sgt.Count(), "xy",
+                sgt.Count()), range(0, 10**6, 997))
+        self._check(lambda: sgt.Permutations("abcdef", 4), range(360))
+
+    def test_fibonacci(self):
+
+        for limit in (None, 8, 1024):
+            shared = self._check(lambda: sgt.Fibonacci(cache_limit=limit),
+                    list(range(300)) + [10**4])
+            self.assertEqual(shared._cache_limit, limit)
+
+    def test_lazy_enumerations(self):
+
+        self._check(lambda: sgt.WeightedProduct(range(8), range(8),
+                range(8), weights=[lambda x: -x, lambda x: x % 3,
+                lambda x: x / 2.0]), range(512))
+
+        def orbits():
+            seq = sgt.Orbits(sgt.Product(range(4), repeat=4), [(1, 2, 3, 0)])
+            seq._STRIDE = 3
+            return seq
+        shared = self._check(orbits, range(orbits().length()))
+        points = list(shared)
+        self.assertEqual(_hammer(lambda tid: [shared.index(p) for p in
+                points])[0], list(range(len(points))))
+
+        # once walked, lookups do not take the lock
+        shared._state_lock = None
+        self.assertEqual([shared[idx] for idx in range(len(points))], points)
+        self.assertEqual(shared.index(points[-1]), len(points) - 1)
+
+    def test_index(self):
+
+        data = [random.Random(0).randrange(1000) for _ in range(500)]
+        expected = [data.index(val) for val in data]
+        shared = sgt.Wrapper(data)
+        for result in _hammer(lambda tid: [shared.index(v) for v in data]):
+            self.assertEqual(result, expected)
+
+    def test_iteration(self):
+
+        shared = sgt.Product(range(10), "abcd")
+        expected = list(sgt.Product(range(10), "abcd"))
+        for result in _hammer(lambda tid: list(shared)):
+            self.assertEqual(result, expected)
+
+        pairs = [(x, y) for x in shared[:5] for y in shared[:5]]
+        self.assertEqual(len(pairs), 25)
+
+        # iterating keeps no cursor on the sequence; next() has its own
+        self.assertEqual(next(shared), expected[0])
+        list(shared)
+        self.assertEqual(next(shared), expected[1])
+        self.assertFalse("_iter_index" in vars(shared))
+
+    def test_thread_local_cache(self):
+
+        shared = sgt.Product(range(20), range(20),
+                cache=sgt.ThreadLocalCache())
+        expected = list(sgt.Product(range(20), range(20)))
+        for result in _hammer(lambda tid: [shared[idx] for idx in
+                range(400)]):
+            self.assertEqual(result, expected)
+        self.assertEqual(len(shared._cache), 0)
+        self.assertTrue(isinstance(shared.copy()._cache,
+                sgt.ThreadLocalCache))
+
+        # constructors with fixed arguments accept the options as well
+        for shared in (sgt.Range(10, cache=sgt.ThreadLocalCache()),
+                sgt.Permutations("abc", cache=sgt.ThreadLocalCache())):
+            self.assertTrue(isinstance(shared._cache, sgt.ThreadLocalCache))
+        chain = sgt.Chain(sgt.Range(3), "ab", cache_limit=0)
+        self.assertEqual([chain[idx] for idx in range(5)], [0, 1, 2, "a", "b"])
+        self.assertEqual(chain._cache, {})
+
+    def test_pickle(self):
+
+        seq = sgt.Product(range(5), sgt.Permutations("abc", 2),
+                cache_limit=10)
+        seq[3]
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            clone = pickle.loads(pickle.dumps(seq, protocol))
+            self.assertEqual([clone[idx] for idx in range(len(clone))],
+                    list(seq))
+            self.assertEqual(clone._cache_limit, 10)
+            self.assertEqual(len(clone._cache), 10)
+
+    def test_persistent_cache(self):
+
+        tmpdir = tempfile.mkdtemp()
+        try:
+            seq = sgt.Product(range(10), range(10))
+            cache = sgt.PersistentCache(seq, os.path.join(tmpdir, "r.db"))
+
+            def work(tid):
+                indices = list(range(100))
+                random.Random(tid).shuffle(indices)
+                return cache.evaluate(sum, indices[:40])
+
+            _hammer(work, nthreads=8)
+            self.assertEqual(cache.get_many(range(100)), dict((idx,
+                    sum(seq[idx])) for idx in cache.completed()))
+            cache.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
+test_classes = (ThreadTests,)